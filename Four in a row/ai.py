@@ -1,6 +1,9 @@
 from game import Game
-from copy import deepcopy
-from datetime import datetime
+from transposition_table import TranspositionTable
+from search_stats import SearchStats
+import multiprocessing
+import queue
+import time
 
 
 class AI:
@@ -8,104 +11,526 @@ class AI:
     A class responsible of evaluating the best possible move in a given turn
     in a game of four in a row. AI objects have attributes "best move", which
     is the column which the ai calculated to be the optimal move in the current
-    turn, and "explored", which is a dictionary with game states as keys and
-    the rating associated with them as values
+    turn, and "table", which is a transposition table caching the results of
+    searching game states
     """
 
     # arrange possible moves so that we start checking from the middle
     # columns first, since we can make the most connections in the middle
-    # of the board
+    # of the board. This is the order for the default board width, other
+    # widths are ordered by get_move_order
     VALID_MOVES = [3, 2, 4, 1, 5, 0, 6]
     PLAYER_DISKS = Game.LAST_TURN // 2
     DEFAULT_TURNS_AHEAD = 7
     MIN_TURNS_AHEAD = 2
     NO_MOVE_ERROR = "No possible AI moves"
     DRAW_RATING = 0
-    RATING = 1
+    # unfinished positions are rated by the board's evaluation, squashed into
+    # (-MAX_HEURISTIC, MAX_HEURISTIC) so it never outweighs a win or a loss.
+    # An evaluation of HEURISTIC_SCALE is rated half of MAX_HEURISTIC
+    MAX_HEURISTIC = 0.5
+    HEURISTIC_SCALE = 64
     LOWEST_RATING = -float("inf")
+    SERIAL = 1
+    # the share of a time limit given to the solver, if any, before falling
+    # back to a regular search
+    SOLVER_SHARE = 0.5
+    # the width of the window a parallel search rates root moves with, to
+    # only find whether they beat the best move so far
+    NULL_WINDOW = 1e-9
+    # the kinds of ratings of a root move in a parallel search
+    FULL_WINDOW = 0
+    NULL_WINDOW_CHECK = 1
+    RESEARCH = 2
 
-    def __init__(self):
+    def __init__(self, table_size=TranspositionTable.DEFAULT_CAPACITY,
+                 workers=SERIAL, book=None, stats_callback=None,
+                 solver=None):
         """
         Constructor for AI object
+        :param table_size: the maximal number of game states to cache (per
+        worker process when searching in parallel)
+        :param workers: the number of processes to search with. With more
+        than one, the moves of each searched state are rated in parallel, one
+        move per process, so there's no use for more workers than columns.
+        Every move is always rated by the same process, whose table then holds
+        the move's previous search depths
+        :param book: An OpeningBook to take moves from, before searching. A
+        book of heuristic moves is only consulted after the solver (if any)
+        failed to solve the position in time, since solved moves are better
+        :param stats_callback: A function that will receive a SearchStats
+        object at the end of every call to find_legal_move
+        :param solver: A Solver to search for the exact best move with,
+        before searching regularly. Without a time limit, the solver always
+        searches to the end of the game, so this is the strongest (and
+        slowest) ai
         """
         self.__best_move = None
-        self.__explored = {}
+        self.__table = TranspositionTable(table_size)
+        self.__table_size = table_size
+        self.__workers = workers
+        self.__pools = None
+        self.__book = book
+        self.__solver = solver
+        self.__deadline = None
+        self.__timed_out = False
+        self.__cancelled = False
+        self.__pv = []
+        self.__variant = None
+        self.__valid_moves = AI.VALID_MOVES
+        self.__player_disks = AI.PLAYER_DISKS
+        self.__stats_callback = stats_callback
+        self.__stats = None
+        self.__reset_stats()
 
-    def find_legal_move(self, g, func, timeout=None):
+    @staticmethod
+    def get_move_order(width):
+        """
+        Order the columns of a board from the middle outwards, left first
+        :param width: the width of the board
+        :return: A list of column indices
+        """
+        return sorted(range(width), key=lambda col: (abs(2 * col - width + 1),
+                                                     col))
+
+    def find_legal_move(self, g, func, timeout=None,
+                        turns_ahead=DEFAULT_TURNS_AHEAD):
         """
         Find a legal move for the ai
         :param g: Game object
-        :param func: A function that will receive a legal move as a parameter
+        :param func: A function that will receive a legal move as a parameter.
+        With a timeout, it is called with the best move of each completed
+        search depth, so its last call holds the best move found in time. It
+        isn't called at all if the search is cancelled
         :param timeout: A float representing a time limit in seconds
+        :param turns_ahead: An integer representing the number of turns ahead
+        to search when there's no time limit
         :return: None
         """
-        start = datetime.now()
         if g.get_winner() is not None:
             raise LookupError(AI.NO_MOVE_ERROR)
+        start = time.perf_counter()
+        # a cancel request only stops a search already in progress
+        self.__cancelled = False
+        self.__prepare(g)
+        self.__reset_stats()
+        book_first = self.__book is not None and (
+            self.__solver is None or self.__book.is_exact())
+        if book_first and self.__play_book_move(g, func, start):
+            return
+        if self.__solver is not None:
+            solver_timeout = None
+            if timeout is not None:
+                solver_timeout = timeout * AI.SOLVER_SHARE
+                timeout -= solver_timeout
+            result = self.__solver.find_best_move(g, solver_timeout)
+            self.__nodes += self.__solver.get_nodes()
+            if result is not None or self.__cancelled:
+                self.__cancelled = False
+                self.__finish_stats(start)
+                if result is not None:
+                    func(result[0])
+                return
+            if self.__book is not None and not book_first and \
+                    self.__play_book_move(g, func, start):
+                return
+        # search on a bit board copy, which is far cheaper to copy, update
+        # and check for wins than the game's own board
+        g = g.get_bitboard_copy()
         cur_turn = g.get_turn()
-        best = AI.PLAYER_DISKS - (cur_turn // 2) # win this turn
-        worst = ((cur_turn + 1) // 2) -AI.PLAYER_DISKS # lose next turn
+        best = self.__player_disks - (cur_turn // 2) # win this turn
+        worst = ((cur_turn + 1) // 2) - self.__player_disks # lose next turn
+        # cached ratings are stored with the depth they were searched to, so
+        # shallow ratings are never mistaken for deeper ones and the table can
+        # be reused between moves and between deepening iterations
+        self.__pv = []
+        self.__timed_out = False
         if timeout is None:
-            # remove all null rating game states from the dictionary so we
-            # may search more turns ahead
-            self.__explored = dict(
-                filter(lambda state: state[AI.RATING] != AI.DRAW_RATING,
-                       self.__explored.items()))
-            self.__rate_moves(AI.DEFAULT_TURNS_AHEAD, g, worst, best)
-            func(self.__best_move)
-        else:
-            turns_ahead = AI.MIN_TURNS_AHEAD
-            while (datetime.now() - start).seconds < timeout:
-                self.__explored = dict(
-                    filter(lambda state: state[AI.RATING] != AI.DRAW_RATING,
-                           self.__explored.items()))
-                rating = self.__rate_moves(turns_ahead, g, worst, best)
-                turns_ahead += 1
-                func(self.__best_move)
-                if rating == best:
-                    break
-
-    def __rate_moves(self, turns_ahead, game_copy, low_bound, up_bound):
-        """
-        Rate moves by checking some turns ahead
+            result = self.__search_depth(g, turns_ahead, worst, best)
+            self.__cancelled = False
+            self.__finish_stats(start)
+            if result is not None:
+                func(result[1])
+            return
+        self.__deadline = time.monotonic() + timeout
+        turns_left = g.get_last_turn() - cur_turn
+        turns_ahead = AI.MIN_TURNS_AHEAD
+        best_move = None
+        while True:
+            result = self.__search_depth(g, turns_ahead, worst, best)
+            # an interrupted search has only explored some of the moves, so
+            # its result is dropped in favour of the last completed depth
+            if result is None:
+                break
+            rating, best_move = result
+            func(best_move)
+            if rating == best or turns_ahead >= turns_left:
+                break
+            self.__pv = self.__principal_variation(g, turns_ahead)
+            turns_ahead += 1
+        if best_move is None and not self.__cancelled:
+            func(next(self.__order_moves(g, self.__pv[:1])))
+        self.__deadline = None
+        self.__cancelled = False
+        self.__finish_stats(start)
+
+    def __play_book_move(self, g, func, start):
+        """
+        Play the book's move of a game's current position, if it has one
+        :param g: Game object
+        :param func: A function that will receive the move
+        :param start: The search's start time, as given by time.perf_counter
+        :return: True if the book had a move, False otherwise
+        """
+        move = self.__book.get_move(g)
+        if move is None:
+            return False
+        self.__finish_stats(start)
+        func(move)
+        return True
+
+    def get_stats(self):
+        """
+        :return: A SearchStats object describing the last call to
+        find_legal_move, None if there was no such call
+        """
+        return self.__stats
+
+    def __prepare(self, g):
+        """
+        Adapt the search to the size of a game's board
+        :param g: Game object
+        :return: None
+        """
+        variant = g.get_height(), g.get_width(), g.get_win_length()
+        if variant == self.__variant:
+            return
+        self.__variant = variant
+        # positions of different variants may share a hash (every empty board
+        # hashes to 0), so cached ratings only hold for the variant they were
+        # searched in
+        self.__table.clear()
+        self.__player_disks = g.get_last_turn() // 2
+        self.__valid_moves = AI.get_move_order(g.get_width())
+
+    def __reset_stats(self):
+        """
+        Zero the counters of the search's stats
+        :return: None
+        """
+        self.__nodes = 0
+        self.__cutoffs = [0] * len(self.__valid_moves)
+        self.__hits = 0
+        self.__misses = 0
+        self.__iterations = []
+
+    def __finish_stats(self, start):
+        """
+        Summarize the counters of a search, and report them to the stats
+        callback, if given
+        :param start: The search's start time, as given by time.perf_counter
+        :return: None
+        """
+        self.__stats = SearchStats(self.__nodes, self.__cutoffs, self.__hits,
+                                   self.__misses, len(self.__table),
+                                   self.__iterations,
+                                   time.perf_counter() - start)
+        if self.__stats_callback is not None:
+            self.__stats_callback(self.__stats)
+
+    def cancel(self):
+        """
+        Stop the search in progress as soon as possible, without reporting a
+        move. May be called from another thread than the searching one, and
+        has no effect on searches started after it. A
+        parallel search stops once the moves its workers are rating are done
+        :return: None
+        """
+        self.__cancelled = True
+        if self.__solver is not None:
+            self.__solver.cancel()
+
+    def rate_move(self, g, move, turns_ahead, timeout=None, low_bound=None,
+                  up_bound=None):
+        """
+        Rate a single move by checking some turns ahead after it
+        :param g: Game object, left unchanged
+        :param move: The column to rate a move in
+        :param turns_ahead: An integer representing the number of turns ahead,
+        including the rated move
+        :param timeout: A float representing a time limit in seconds
+        :param low_bound: A rating the move is only of interest above, the
+        lowest possible rating if None
+        :param up_bound: A rating the move is only of interest below, the
+        highest possible rating if None
+        :return: The rating of the move, or None if the time limit passed
+        before it was found. The rating is exact if it's between the bounds,
+        otherwise it's a bound at or beyond the nearer one. The search is
+        described by get_stats
+        """
+        start = time.perf_counter()
+        self.__cancelled = False
+        self.__prepare(g)
+        self.__reset_stats()
+        g = g.get_bitboard_copy()
+        cur_turn = g.get_turn()
+        best = self.__player_disks - (cur_turn // 2)
+        worst = ((cur_turn + 1) // 2) - self.__player_disks
+        self.__pv = []
+        self.__timed_out = False
+        if timeout is not None:
+            self.__deadline = time.monotonic() + timeout
+        if low_bound is not None:
+            worst = max(worst, low_bound)
+        if up_bound is not None:
+            best = min(best, up_bound)
+        g.make_move(move)
+        rating = -self.__rate_moves(turns_ahead - 1, g, -best, -worst)
+        self.__deadline = None
+        self.__finish_stats(start)
+        if self.__timed_out:
+            return None
+        return rating
+
+    def close(self):
+        """
+        Stop the worker processes of a parallel search, if any were started
+        :return: None
+        """
+        if self.__pools is not None:
+            for pool in self.__pools:
+                pool.terminate()
+                pool.join()
+            self.__pools = None
+
+    def __search_depth(self, game_copy, turns_ahead, low_bound, up_bound):
+        """
+        Search a game state to a given depth, serially or in parallel
+        :param game_copy: A game object
+        :param turns_ahead: An integer representing the number of turns ahead
+        :param low_bound: lowest rating calculated
+        :param up_bound: highest rating calculated
+        :return: A tuple (rating, move) of the best move, or None if the
+        search deadline passed first
+        """
+        start, nodes = time.perf_counter(), self.__nodes
+        if self.__workers <= AI.SERIAL:
+            rating = self.__rate_moves(turns_ahead, game_copy, low_bound,
+                                       up_bound)
+            if self.__timed_out:
+                return None
+            self.__iterations.append(
+                (turns_ahead, time.perf_counter() - start,
+                 self.__nodes - nodes))
+            return rating, self.__best_move
+        if self.__pools is None:
+            # a pool per worker, so every move is sent to the same process
+            self.__pools = [multiprocessing.Pool(1, _init_worker,
+                                                 (self.__table_size,))
+                            for _ in range(self.__workers)]
+        deadline = None
+        if self.__deadline is not None:
+            # moves may be rated long after they're dispatched, so workers
+            # are given the deadline itself, as a wall clock time
+            deadline = time.time() + self.__deadline - time.monotonic()
+        moves = list(self.__order_moves(game_copy, self.__pv[:1]))
+        # the first move is rated alone, with the full window. The others
+        # are then only checked to beat the best rating so far, with a null
+        # window, which cuts them off far sooner, and only the moves that do
+        # are rated again, with a window from the best rating up. Moves are
+        # rated out of search order, so a move is checked to reach the best
+        # rating, rather than beat it, if a later move holds it. This way ties
+        # still go to the earliest move, as in the serial search
+        queues = [[] for _ in self.__pools]
+        busy = [False] * len(self.__pools)
+        done = queue.Queue()
+        best_rating, best_index = None, None
+        stopped = False
+
+        def enqueue(index, kind):
+            col = self.__valid_moves.index(moves[index])
+            queues[col % len(self.__pools)].append((index, kind))
+
+        enqueue(0, AI.FULL_WINDOW)
+        while True:
+            for worker, pool in enumerate(self.__pools):
+                if stopped or busy[worker] or not queues[worker]:
+                    continue
+                index, kind = queues[worker].pop(0)
+                low, up = low_bound, up_bound
+                if kind != AI.FULL_WINDOW:
+                    low = best_rating
+                    if best_index > index:
+                        low -= AI.NULL_WINDOW
+                    if kind == AI.NULL_WINDOW_CHECK:
+                        up = low + AI.NULL_WINDOW
+                task = worker, index, kind, low
+                busy[worker] = True
+                pool.apply_async(
+                    _rate_move, ((game_copy, moves[index], turns_ahead,
+                                  deadline, low, up),),
+                    callback=lambda result, task=task:
+                    done.put((task, result)),
+                    error_callback=lambda error, task=task:
+                    done.put((task, error)))
+            if not any(busy):
+                break
+            (worker, index, kind, low), result = done.get()
+            busy[worker] = False
+            if isinstance(result, BaseException):
+                raise result
+            rating, stats = result
+            self.__nodes += stats.get_nodes()
+            self.__hits += stats.get_hits()
+            self.__misses += stats.get_misses()
+            for col, cutoffs in enumerate(stats.get_cutoffs()):
+                self.__cutoffs[col] += cutoffs
+            if rating is None or self.__cancelled:
+                stopped = True
+            elif kind == AI.FULL_WINDOW:
+                best_rating, best_index = rating, index
+                for later in range(1, len(moves)):
+                    enqueue(later, AI.NULL_WINDOW_CHECK)
+            elif rating > low and kind == AI.NULL_WINDOW_CHECK:
+                # the move beat the best rating so far, by an unknown margin
+                enqueue(index, AI.RESEARCH)
+            elif rating > low and (rating > best_rating or
+                                   (rating == best_rating and
+                                    index < best_index)):
+                # ratings above the window's low end are exact
+                best_rating, best_index = rating, index
+        if stopped:
+            self.__timed_out = True
+            return None
+        best_move = moves[best_index]
+        # store the root result so that the next depth's line of play
+        # starts from the best move
+        self.__table.store(game_copy.get_board().get_hash(), turns_ahead,
+                           best_rating, TranspositionTable.EXACT, best_move)
+        self.__iterations.append((turns_ahead, time.perf_counter() - start,
+                                  self.__nodes - nodes))
+        return best_rating, best_move
+
+    def __principal_variation(self, game_copy, length):
+        """
+        Follow the best moves stored in the table from a game state
+        :param game_copy: A game object, left unchanged
+        :param length: The maximal number of moves to follow
+        :return: A list of moves, the expected line of play
+        """
+        pv = []
+        while len(pv) < length and game_copy.get_winner() is None:
+            entry = self.__table.lookup(game_copy.get_board().get_hash())
+            if entry is None or entry[-1] is None or \
+                    entry[-1] not in game_copy.get_legal_moves():
+                break
+            pv.append(entry[-1])
+            game_copy.make_move(entry[-1])
+        for move in reversed(pv):
+            game_copy.undo_move(move)
+        return pv
+
+    def __order_moves(self, game_copy, first_moves):
+        """
+        Generate the legal moves of a game, best candidates first
+        :param game_copy: A game object
+        :param first_moves: Moves to try before all others, if legal
+        :return: A generator of column indices
+        """
+        tried = set()
+        for move in first_moves:
+            if move is not None and move not in tried and \
+                    game_copy.get_board().can_add_to_col(move):
+                tried.add(move)
+                yield move
+        for move in game_copy.get_legal_moves(self.__valid_moves):
+            if move not in tried:
+                yield move
+
+    @staticmethod
+    def __rate_position(game_copy):
+        """
+        Rate an unfinished game state without searching it
+        :param game_copy: A game object
+        :return: A float strictly between -MAX_HEURISTIC and MAX_HEURISTIC,
+        positive if the state favours the player about to move
+        """
+        score = game_copy.get_board().get_evaluation(
+            game_copy.get_current_player())
+        return AI.MAX_HEURISTIC * score / (abs(score) + AI.HEURISTIC_SCALE)
+
+    def __rate_moves(self, turns_ahead, game_copy, low_bound, up_bound,
+                     ply=0, on_pv=True):
+        """
+        Rate moves by checking some turns ahead. If the search deadline
+        passes, the search is abandoned and the returned rating is meaningless
         :param turns_ahead: An integer representing the number of turns ahead
         :param game_copy: A game object
         :param low_bound: lowest rating calculated
         :param up_bound: highest rating calculated
-        :return: A tuple with the best rating and either None for the lowest
-        recursion level or an integer representing a move for higher levels
+        :param ply: The number of moves made since the searched state
+        :param on_pv: True if the moves made so far are the principal
+        variation of the previous search depth
+        :return: The best rating of the game state
         """
+        self.__nodes += 1
+        if self.__cancelled or (self.__deadline is not None and
+                                time.monotonic() > self.__deadline):
+            self.__timed_out = True
+            return AI.DRAW_RATING
         winner = game_copy.get_winner()
         if turns_ahead == 0 or winner is not None:
             # we rate a move ending with the opponent's win as the opponent's
             # winning disk index - opponent's total disks. If the game ended,
             # than either the opponent won (because opponent was the last to
-            # make a move) or the game ended with a draw
-            rating = (game_copy.get_turn() // 2) - AI.PLAYER_DISKS
-            if winner is None or winner == Game.DRAW:
-                rating = AI.DRAW_RATING
-            return rating
+            # make a move) or the game ended with a draw. A game that didn't
+            # end is rated by how promising it looks
+            if winner is None:
+                return self.__rate_position(game_copy)
+            if winner == Game.DRAW:
+                return AI.DRAW_RATING
+            return (game_copy.get_turn() // 2) - self.__player_disks
+        # a single state of the game can be reached in multiple ways, so we
+        # cache the result of searching each state. A cached rating may only
+        # be a bound if the search of the state was cut off
+        key = game_copy.get_board().get_hash()
+        entry = self.__table.lookup(key)
+        table_move = None
+        if entry is None:
+            self.__misses += 1
+        else:
+            self.__hits += 1
+            depth, rating, flag, table_move = entry
+            if depth >= turns_ahead:
+                if flag == TranspositionTable.LOWER_BOUND:
+                    low_bound = max(low_bound, rating)
+                elif flag == TranspositionTable.UPPER_BOUND:
+                    up_bound = min(up_bound, rating)
+                if flag == TranspositionTable.EXACT or low_bound >= up_bound:
+                    self.__best_move = table_move
+                    return rating
+        original_low = low_bound
         best_rating = AI.LOWEST_RATING
-        for move in AI.VALID_MOVES:
-            temp_game = deepcopy(game_copy)
-            try:
-                temp_game.make_move(move)
-            except RuntimeError:
-                continue
-            # a single state of the game can be reached in multiple ways,
-            # so we cache the rating of each state, so that we don't need
-            # to compute it more than once
-            state = str(temp_game.get_board())
-            if state in self.__explored:
-                rating = self.__explored[state]
-            else:
-                # we calculate the rating of the move alternating between the
-                # player and the opponent. We assume that the opponent will
-                # always choose the best move that he can, which is the worst
-                # move as far as the player is concerned.
-                rating = -self.__rate_moves(turns_ahead - 1, temp_game,
-                                            -up_bound, -low_bound)
-                self.__explored[state] = rating
+        # the previous depth's line of play and the cached best move are the
+        # likeliest to be best, and trying them first causes more cutoffs
+        pv_move = None
+        if on_pv and ply < len(self.__pv):
+            pv_move = self.__pv[ply]
+        for index, move in enumerate(
+                self.__order_moves(game_copy, (pv_move, table_move))):
+            # the move is made on the searched game itself and taken back
+            # once rated, so no copy of the game is needed for each move.
+            # we calculate the rating of the move alternating between the
+            # player and the opponent. We assume that the opponent will
+            # always choose the best move that he can, which is the worst
+            # move as far as the player is concerned.
+            game_copy.make_move(move)
+            rating = -self.__rate_moves(turns_ahead - 1, game_copy,
+                                        -up_bound, -low_bound, ply + 1,
+                                        on_pv and move == pv_move)
+            game_copy.undo_move(move)
+            if self.__timed_out:
+                return AI.DRAW_RATING
             if rating > best_rating:
                 best_rating, best_move = rating, move
             # we want the moves with the highest rating, so if the rating is
@@ -116,6 +541,47 @@ class AI:
             # opponent will choose the lowest rating possible
             low_bound = max(low_bound, rating)
             if low_bound >= up_bound:
+                self.__cutoffs[index] += 1
                 break
+        if best_rating <= original_low:
+            flag = TranspositionTable.UPPER_BOUND
+        elif best_rating >= up_bound:
+            flag = TranspositionTable.LOWER_BOUND
+        else:
+            flag = TranspositionTable.EXACT
+        self.__table.store(key, turns_ahead, best_rating, flag, best_move)
         self.__best_move = best_move
         return best_rating
+
+
+# the AI of a worker process of a parallel search. It lives as long as the
+# process, so its table is reused by all the moves the process rates
+_worker_ai = None
+
+
+def _init_worker(table_size):
+    """
+    Initialize a worker process of a parallel search
+    :param table_size: the maximal number of game states to cache
+    :return: None
+    """
+    global _worker_ai
+    _worker_ai = AI(table_size)
+
+
+def _rate_move(task):
+    """
+    Rate a move in a worker process of a parallel search
+    :param task: A tuple (game, move, turns_ahead, deadline, low_bound,
+    up_bound), where the deadline is a time as given by time.time, or None
+    for no time limit, and the bounds are as taken by AI.rate_move
+    :return: A tuple of the rating of the move, or None if the deadline
+    passed, and the SearchStats of rating it
+    """
+    g, move, turns_ahead, deadline, low_bound, up_bound = task
+    timeout = None
+    if deadline is not None:
+        timeout = max(deadline - time.time(), 0)
+    rating = _worker_ai.rate_move(g, move, turns_ahead, timeout, low_bound,
+                                  up_bound)
+    return rating, _worker_ai.get_stats()
@@ -0,0 +1,126 @@
+import queue
+import threading
+
+
+class AIWorker:
+    """
+    Runs an AI's search on a background thread, so that the tkinter main loop
+    keeps handling events while the AI thinks. The moves the AI reports are
+    passed back through a thread safe queue, which the main loop polls, so
+    the given callbacks are always invoked on the main loop's thread
+    """
+
+    POLL_PERIOD = 10  # The wait period between two queue reads (in ms).
+    CANCEL_PERIOD = 0.01  # The wait period between two cancel requests (s).
+    BEST_MOVE = 0
+    FINAL_MOVE = 1
+
+    def __init__(self, root, ai):
+        """
+        Constructor for AI worker object
+        :param root: the tkinter root (used for accessing the main loop).
+        :param ai: The AI object searching for moves
+        """
+        self.__root = root
+        self.__ai = ai
+        self.__queue = queue.Queue()
+        self.__thread = None
+        self.__search_id = 0
+        self.__on_move = None
+        self.__on_best_move = None
+
+    def start(self, g, on_move, on_best_move=None, timeout=None):
+        """
+        Start searching for a move in the background, cancelling any search
+        in progress
+        :param g: Game object. The search runs on a copy of it, so it may be
+        changed during the search
+        :param on_move: A function that will receive the chosen move
+        :param on_best_move: A function that will receive the best move found
+        so far, each time the search completes a depth
+        :param timeout: A float representing a time limit in seconds
+        :return: None
+        """
+        self.cancel()
+        self.__search_id += 1
+        self.__on_move = on_move
+        self.__on_best_move = on_best_move
+        self.__thread = threading.Thread(
+            target=self.__search,
+            args=(self.__search_id, g.get_bitboard_copy(), timeout),
+            daemon=True)
+        self.__thread.start()
+        self.__root.after(AIWorker.POLL_PERIOD, self.__poll, self.__search_id)
+
+    def cancel(self):
+        """
+        Cancel the search in progress, if any. Its moves will not be reported
+        :return: None
+        """
+        if self.__thread is None:
+            return
+        # moves already queued by the cancelled search are told apart by
+        # their old search id and dropped
+        self.__search_id += 1
+        # a search that already ended isn't cancelled, since the request would
+        # apply to nothing. A request may also come just before the search
+        # starts, and be dropped when it does, so it's repeated until the
+        # search ends
+        while self.__thread.is_alive():
+            self.__ai.cancel()
+            self.__thread.join(AIWorker.CANCEL_PERIOD)
+        self.__thread = None
+
+    def is_searching(self):
+        """
+        :return: True if a search is in progress, False otherwise
+        """
+        return self.__thread is not None
+
+    def __search(self, search_id, g, timeout):
+        """
+        Run a search and queue the moves it reports. Runs on the worker thread
+        :param search_id: An integer identifying the search
+        :param g: Game object to search
+        :param timeout: A float representing a time limit in seconds
+        :return: None
+        """
+        moves = []
+
+        def report(move):
+            moves.append(move)
+            self.__queue.put((search_id, AIWorker.BEST_MOVE, move))
+
+        self.__ai.find_legal_move(g, report, timeout)
+        if moves:
+            self.__queue.put((search_id, AIWorker.FINAL_MOVE, moves[-1]))
+
+    def __poll(self, search_id):
+        """
+        Upon regular intervals, hand the moves queued by the worker thread to
+        the callbacks. Stops once the search's final move was handled, or the
+        search was cancelled or ended without a move
+        :param search_id: An integer identifying the polled search
+        :return: None
+        """
+        if search_id != self.__search_id:
+            return
+        finished = not self.__thread.is_alive()
+        while True:
+            try:
+                move_id, kind, move = self.__queue.get_nowait()
+            except queue.Empty:
+                break
+            if move_id != search_id:
+                continue
+            if kind == AIWorker.FINAL_MOVE:
+                self.__thread.join()
+                self.__thread = None
+                self.__on_move(move)
+                return
+            if self.__on_best_move is not None:
+                self.__on_best_move(move)
+        if finished:
+            self.__thread = None
+        else:
+            self.__root.after(AIWorker.POLL_PERIOD, self.__poll, search_id)
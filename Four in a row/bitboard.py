@@ -0,0 +1,251 @@
+from board import Board
+from zobrist import Zobrist
+from evaluator import Evaluator
+
+
+class BitBoard:
+    """
+    A compact board for a game of four in a row. Each player's disks are kept
+    in a single integer used as a bit mask, where every column takes
+    "height + 1" bits (the extra bit is an always empty separator, so lines
+    never wrap from one column to the next). Bit index
+    col * (height + 1) + i stands for the cell i rows above the bottom of
+    column col. A BitBoard exposes the same interface as Board, and detects
+    wins with a few shift-and-mask operations per direction (logarithmic in
+    the streak length). Python integers grow as needed, so boards of any
+    size are supported
+    """
+
+    EMPTY = Board.EMPTY
+    TOP = Board.TOP
+    FULL_STACK_ERROR = Board.FULL_STACK_ERROR
+    EMPTY_STACK_ERROR = Board.EMPTY_STACK_ERROR
+    DIRECTION_ERROR = Board.DIRECTION_ERROR
+    WIN_LENGTH = Board.WIN_LENGTH
+    PLAYERS = 2
+
+    def __init__(self, height, width, win_length=WIN_LENGTH):
+        """
+        Constructor for bit board object
+        :param height: the height of the board
+        :param width: the width of the board
+        :param win_length: the length of a winning streak
+        """
+        self.__win_length = win_length
+        self.__height = height
+        self.__width = width
+        self.__col_bits = height + 1
+        self.__disks = [0] * BitBoard.PLAYERS
+        self.__bottoms = [height - 1 for _ in range(width)]
+        self.__zobrist_keys = Zobrist.get_keys(height, width)
+        self.__hash = 0
+        self.__evaluator = Evaluator(height, width, win_length)
+        # shift amounts for vertical, horizontal and both diagonal lines
+        self.__shifts = (1, self.__col_bits, self.__col_bits + 1,
+                         self.__col_bits - 1)
+
+    @staticmethod
+    def from_cells(cells, win_length=WIN_LENGTH):
+        """
+        Create a bit board holding the same disks as a matrix of cells
+        :param cells: A list of lists, as returned by Board.get_cells
+        :param win_length: the length of a winning streak
+        :return: A BitBoard object
+        """
+        height, width = len(cells), len(cells[0])
+        board = BitBoard(height, width, win_length)
+        for col in range(width):
+            for row in range(height - 1, -1, -1):
+                if cells[row][col] is BitBoard.EMPTY:
+                    break
+                board.add_to_col(cells[row][col], col)
+        return board
+
+    def __bit(self, row, col):
+        """
+        :param row: Row index
+        :param col: Column index
+        :return: The bit mask of a single cell
+        """
+        return 1 << (col * self.__col_bits + self.__height - 1 - row)
+
+    def get_player_at(self, location):
+        """
+        Get the content of the board in a given location
+        :param location: A tuple representing the required (row, col) location
+        :return: Either an integer or none
+        """
+        bit = self.__bit(*location)
+        for player, disks in enumerate(self.__disks):
+            if disks & bit:
+                return player
+        return BitBoard.EMPTY
+
+    def add_to_col(self, player, col):
+        """
+        Place a player disk at the lowest free cell of the stack
+        :param player: An integer representing the player
+        :param col: Index of the column to add disk to
+        :return: None
+        """
+        if self.__bottoms[col] < BitBoard.TOP:
+            raise RuntimeError(BitBoard.FULL_STACK_ERROR)
+        self.__disks[player] |= self.__bit(self.__bottoms[col], col)
+        self.__hash ^= self.__zobrist_keys[player][
+            self.__bottoms[col] * self.__width + col]
+        self.__evaluator.add(player, self.__bottoms[col], col)
+        self.__bottoms[col] -= 1
+
+    def remove_from_col(self, col):
+        """
+        Remove the top disk of a column, undoing the last add_to_col to it
+        :param col: Index of the column to remove disk from
+        :return: None
+        """
+        if self.__bottoms[col] == self.__height - 1:
+            raise RuntimeError(BitBoard.EMPTY_STACK_ERROR)
+        self.__bottoms[col] += 1
+        row = self.__bottoms[col]
+        bit = self.__bit(row, col)
+        for player in range(BitBoard.PLAYERS):
+            if self.__disks[player] & bit:
+                self.__disks[player] &= ~bit
+                self.__hash ^= self.__zobrist_keys[player][
+                    row * self.__width + col]
+                self.__evaluator.remove(player, row, col)
+
+    def can_add_to_col(self, col):
+        """
+        :param col: Index of a column
+        :return: True if the column has a free cell, False otherwise
+        """
+        return self.__bottoms[col] >= BitBoard.TOP
+
+    def is_win(self, player):
+        """
+        Check whether a player has a winning streak anywhere on the board
+        :param player: An integer representing the player
+        :return: True if the player has a winning streak
+        """
+        disks = self.__disks[player]
+        for shift in self.__shifts:
+            # after the loop, a bit is set only if it starts a line of
+            # "length" consecutive disks in the shift's direction
+            streak, length = disks, 1
+            while length * 2 <= self.__win_length:
+                streak &= streak >> (length * shift)
+                length *= 2
+            if length < self.__win_length:
+                streak &= streak >> ((self.__win_length - length) * shift)
+            if streak:
+                return True
+        return False
+
+    def find_streak(self, col, player):
+        """
+        Search for a winning streak through the disk last added to a column
+        :param col: The column to which the last disk was added
+        :param player: An integer representing the player
+        :return: A list of (row, col) tuples if such a streak exists, None
+        otherwise
+        """
+        if not self.is_win(player):
+            return None
+        for direction in Board.DIRECTIONS:
+            streak = self.search_streak(col, direction, player)
+            if streak is not None:
+                return streak
+        return None
+
+    def search_streak(self, col, direction, player):
+        """
+        Search for a winning streak of player disks
+        :param col: The column to which the last disk was added
+        :param direction: The direction in which to search
+        :param player: An integer representing the player
+        :return: A list of (row, col) tuples if such a streak exists, None
+        otherwise
+        """
+        if direction not in Board.STEPS:
+            raise TypeError(BitBoard.DIRECTION_ERROR)
+        row_step, col_step = Board.STEPS[direction]
+        row = self.__bottoms[col] + 1
+        # walk back to the first disk of the streak, then collect forwards
+        for _ in range(self.__win_length - 1):
+            if not self.__is_player_at(row - row_step, col - col_step,
+                                       player):
+                break
+            row, col = row - row_step, col - col_step
+        streak = []
+        while self.__is_player_at(row, col, player) and \
+                len(streak) < self.__win_length:
+            streak.append((row, col))
+            row, col = row + row_step, col + col_step
+        if len(streak) < self.__win_length:
+            return None
+        return streak
+
+    def __is_player_at(self, row, col, player):
+        """
+        :param row: Row index, possibly outside the board
+        :param col: Column index, possibly outside the board
+        :param player: An integer representing the player
+        :return: True if the cell is on the board and holds a player disk
+        """
+        if not (0 <= row < self.__height and 0 <= col < self.__width):
+            return False
+        return bool(self.__disks[player] & self.__bit(row, col))
+
+    def get_key(self):
+        """
+        :return: An integer uniquely identifying the disks on the board
+        """
+        # adding the first player's disks to the occupied cells mask gives a
+        # unique number, since each column's mask is a contiguous run of bits
+        return self.__disks[0] + (self.__disks[0] | self.__disks[1])
+
+    def get_disks(self, player):
+        """
+        :param player: An integer representing the player
+        :return: The bit mask of the player's disks
+        """
+        return self.__disks[player]
+
+    def get_evaluation(self, player):
+        """
+        :param player: An integer representing the player
+        :return: An integer estimating how good the position is for the
+        player, as kept by an Evaluator
+        """
+        return self.__evaluator.get_score(player)
+
+    def get_hash(self):
+        """
+        :return: The Zobrist hash of the disks on the board
+        """
+        return self.__hash
+
+    def get_bottoms(self):
+        """
+        :return: A list representing the bottom row of each column
+        """
+        return self.__bottoms
+
+    def get_cells(self):
+        """
+        :return: A matrix representing the current game state
+        """
+        return [[self.get_player_at((row, col))
+                 for col in range(self.__width)]
+                for row in range(self.__height)]
+
+    def __str__(self):
+        """
+        :return: A string representation of the board
+        """
+        string = ""
+        for row in self.get_cells():
+            for cell in row:
+                string += str(cell).center(4)
+            string += "\n"
+        return string
@@ -1,3 +1,5 @@
+from zobrist import Zobrist
+from evaluator import Evaluator
 
 
 class Board:
@@ -5,28 +7,38 @@ class Board:
     A class representing a board in a game of four in a row. A board has
     attributes "cells", which is a list of lists representing the cells of
     the board, and "bottoms", which is a list representing the lowest free
-    cell of each column in the board
+    cell of each column in the board. Boards may be of any size, and a
+    streak of any length may be required for a win
     """
 
     EMPTY = None
     TOP = 0
     FULL_STACK_ERROR = "Illegal move"
+    EMPTY_STACK_ERROR = "Illegal undo"
     VERTICAL = 2
     HORIZONTAL = 6
     DIAGONAL1 = 9
     DIAGONAL2 = 3
     DIRECTIONS = (2, 6, 9, 3)
+    # (row step, column step) of each direction, rows growing downwards
+    STEPS = {VERTICAL: (1, 0), HORIZONTAL: (0, 1), DIAGONAL1: (-1, 1),
+             DIAGONAL2: (1, 1)}
     WIN_LENGTH = 4
     DIRECTION_ERROR = "Invalid direction"
 
-    def __init__(self, height, width):
+    def __init__(self, height, width, win_length=WIN_LENGTH):
         """
         Constructor for board object
         :param height: the height of the board
         :param width: the width of the board
+        :param win_length: the length of a winning streak
         """
+        self.__win_length = win_length
         self.__cells = [[Board.EMPTY] * width for _ in range(height)]
         self.__bottoms = [height - 1 for _ in range(width)]
+        self.__zobrist_keys = Zobrist.get_keys(height, width)
+        self.__hash = 0
+        self.__evaluator = Evaluator(height, width, win_length)
 
     def get_player_at(self, location):
         """
@@ -47,134 +59,101 @@ class Board:
         if self.__bottoms[col] < Board.TOP:
             raise RuntimeError(Board.FULL_STACK_ERROR)
         self.__cells[self.__bottoms[col]][col] = player
+        self.__hash ^= self.__zobrist_keys[player][
+            self.__bottoms[col] * len(self.__cells[0]) + col]
+        self.__evaluator.add(player, self.__bottoms[col], col)
         self.__bottoms[col] -= 1
 
-    def search_streak(self, col, direction, player):
+    def remove_from_col(self, col):
+        """
+        Remove the top disk of a column, undoing the last add_to_col to it
+        :param col: Index of the column to remove disk from
+        :return: None
+        """
+        if self.__bottoms[col] == len(self.__cells) - 1:
+            raise RuntimeError(Board.EMPTY_STACK_ERROR)
+        self.__bottoms[col] += 1
+        row = self.__bottoms[col]
+        self.__hash ^= self.__zobrist_keys[self.__cells[row][col]][
+            row * len(self.__cells[0]) + col]
+        self.__evaluator.remove(self.__cells[row][col], row, col)
+        self.__cells[row][col] = Board.EMPTY
+
+    def can_add_to_col(self, col):
         """
-        Search for a winning streak of player disks
+        :param col: Index of a column
+        :return: True if the column has a free cell, False otherwise
+        """
+        return self.__bottoms[col] >= Board.TOP
+
+    def find_streak(self, col, player):
+        """
+        Search for a winning streak through the disk last added to a column
         :param col: The column to which the last disk was added
-        :param direction: The direction in which to search
         :param player: An integer representing the player
         :return: A list of (row, col) tuples if such a streak exists, None
         otherwise
         """
-        if direction == Board.VERTICAL:
-            return self.__search_vertical(col, player)
-        elif direction == Board.HORIZONTAL:
-            return self.__search_horizontal(self.__bottoms[col] + 1, player)
-        elif direction == Board.DIAGONAL1:
-            return self.__search_streak_diagonal1(self.__bottoms[col] + 1, col,
-                                                  player, self.__cells)
-        elif direction == Board.DIAGONAL2:
-            return self.__search_streak_diagonal2(self.__bottoms[col] + 1, col,
-                                                  player)
-        else:
-            raise TypeError(Board.DIRECTION_ERROR)
+        for direction in Board.DIRECTIONS:
+            streak = self.search_streak(col, direction, player)
+            if streak is not None:
+                return streak
+        return None
 
-    def __search_vertical(self, col, player):
+    def search_streak(self, col, direction, player):
         """
-        Search for a streak with a given length of player disks vertically
+        Search for a winning streak of player disks through the disk last
+        added to a column. Only the cells within a streak's length of that
+        disk are checked, so the search doesn't grow with the board's size
         :param col: The column to which the last disk was added
+        :param direction: The direction in which to search
         :param player: An integer representing the player
         :return: A list of (row, col) tuples if such a streak exists, None
         otherwise
         """
-        streak = []
-        if self.__bottoms[col] + Board.WIN_LENGTH > len(self.__cells):
-            return None
-        for row in range(self.__bottoms[col]+1, len(self.__cells)):
-            if self.__cells[row][col] == player:
-                streak.append((row, col))
-            else:
-                streak = []
-            if len(streak) == Board.WIN_LENGTH:
+        if direction not in Board.STEPS:
+            raise TypeError(Board.DIRECTION_ERROR)
+        row_step, col_step = Board.STEPS[direction]
+        row = self.__bottoms[col] + 1
+        # walk back to the first disk of the streak, then collect forwards
+        for _ in range(self.__win_length - 1):
+            if not self.__is_player_at(row - row_step, col - col_step,
+                                       player):
                 break
-        else:
+            row, col = row - row_step, col - col_step
+        streak = []
+        while self.__is_player_at(row, col, player) and \
+                len(streak) < self.__win_length:
+            streak.append((row, col))
+            row, col = row + row_step, col + col_step
+        if len(streak) < self.__win_length:
             return None
         return streak
 
-    def __search_horizontal(self, row, player):
+    def __is_player_at(self, row, col, player):
         """
-        Search for a streak with a given length of player disks horizontally
-        :param row: The row to which the last disk was added
+        :param row: Row index, possibly outside the board
+        :param col: Column index, possibly outside the board
         :param player: An integer representing the player
-        :return: A list of (row, col) tuples if such a streak exists, None
-        otherwise
+        :return: True if the cell is on the board and holds a player disk
         """
-        streak = []
-        for col in range(len(self.__cells[0])):
-            if self.__cells[row][col] == player:
-                streak.append((row, col))
-            else:
-                streak = []
-            if len(streak) == Board.WIN_LENGTH:
-                break
-        else:
-            return None
-        return streak
+        return 0 <= row < len(self.__cells) and \
+            0 <= col < len(self.__cells[0]) and \
+            self.__cells[row][col] == player
 
-    def __search_streak_diagonal1(self, row, col, player, matrix):
+    def get_evaluation(self, player):
         """
-        Search for a streak with a given length of player disks horizontally
-        :param row: The row to which the last disk was added
-        :param col: The column to which the last disk was added
         :param player: An integer representing the player
-        :param matrix: A list of lists representing the board
-        :return: A list of (row, col) tuples if such a streak exists, None
-        otherwise
+        :return: An integer estimating how good the position is for the
+        player, as kept by an Evaluator
         """
-        # the length of a bottom-left to top-right diagonal containing a given
-        # cell is calculated as follows: if the height of the matrix is smaller
-        # than or equal to the width - the length is the sum of row and column
-        # indices + 1 if sum <= height and maximal diagonal length - |maximal
-        # diagonal length - sum of indices| if sum > height
-        height = len(matrix)
-        width = len(matrix[0])
-        max_diagonal = min(width, height)
-        indices_sum = row + col
-        if indices_sum < height:
-            diag_len = indices_sum + 1
-            row_range = range(indices_sum, -1, -1)
-            col_range = range(diag_len)
-        else:
-            diag_len = max_diagonal - abs(max_diagonal - indices_sum)
-            row_range = range(height - 1, height - diag_len - 1, -1)
-            col_range = range(width - diag_len, width)
-        if diag_len < Board.WIN_LENGTH:
-            return None
-        streak = []
-        for row_idx, col_idx in zip(row_range, col_range):
-            if matrix[row_idx][col_idx] == player:
-                streak.append((row_idx, col_idx))
-            else:
-                streak = []
-            if len(streak) == Board.WIN_LENGTH:
-                break
-        else:
-            return None
-        return streak
+        return self.__evaluator.get_score(player)
 
-    def __search_streak_diagonal2(self, row, col, player):
+    def get_hash(self):
         """
-        Search for a streak with a given length of player disks horizontally
-        :param row: The row to which the last disk was added
-        :param col: The column to which the last disk was added
-        :param player: An integer representing the player
-        :return: A list of (row, col) tuples if such a streak exists, None
-        otherwise
+        :return: The Zobrist hash of the disks on the board
         """
-        width = len(self.__cells[0])
-        reversed_board = []
-        for prev_row in self.__cells:
-            reversed_board.append(prev_row[::-1])
-        new_col = width - col - 1
-        streak = self.__search_streak_diagonal1(row, new_col, player,
-                                                reversed_board)
-        if streak is not None:
-            for index, loc in enumerate(streak):
-                row_idx, col_idx = loc
-                streak[index] = row_idx, width - col_idx - 1
-        return streak
+        return self.__hash
 
     def get_bottoms(self):
         """
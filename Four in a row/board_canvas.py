@@ -0,0 +1,102 @@
+import tkinter as tk
+
+
+class BoardCanvas:
+    """
+    A class drawing the board of a four in a row game on a single tkinter
+    canvas. Empty cells are drawn once, and every disk is a canvas image item
+    placed over its cell, so a move only changes a single item and tkinter
+    only redraws the area that item covers. A dropped disk falls one cell per
+    frame, with frames scheduled on the main loop, so animations never block
+    the gui or the communicator
+    """
+
+    DROP_RATE = 100  # The time each frame of a falling disk is shown (ms).
+
+    def __init__(self, master, height, width, empty_image, disk_images,
+                 win_images):
+        """
+        Constructor for board canvas object
+        :param master: The tkinter widget holding the canvas
+        :param height: the height of the board
+        :param width: the width of the board
+        :param empty_image: The image of an empty cell
+        :param disk_images: A list of the image of each player's disk
+        :param win_images: A list of the image of each player's disk when
+        part of the winning streak
+        """
+        self.__cell_width = empty_image.width()
+        self.__cell_height = empty_image.height()
+        self.__disk_images = disk_images
+        self.__win_images = win_images
+        self.__canvas = tk.Canvas(master, width=width * self.__cell_width,
+                                  height=height * self.__cell_height,
+                                  highlightthickness=0)
+        self.__disks = {}
+        for row in range(height):
+            for col in range(width):
+                self.__canvas.create_image(self.__cell_position(row, col),
+                                           image=empty_image, anchor=tk.NW)
+
+    def __cell_position(self, row, col):
+        """
+        :param row: Row index
+        :param col: Column index
+        :return: A tuple (x, y) of the top left corner of a cell on the canvas
+        """
+        return col * self.__cell_width, row * self.__cell_height
+
+    def pack(self, **options):
+        """
+        Pack the canvas into its master widget
+        :param options: Options as taken by tkinter's pack
+        :return: None
+        """
+        self.__canvas.pack(**options)
+
+    def get_cell_width(self):
+        """
+        :return: The width of a cell in pixels
+        """
+        return self.__cell_width
+
+    def drop(self, player, row, col):
+        """
+        Drop a player disk down a column, to come to rest in a given row
+        :param player: An integer representing the player
+        :param row: The row the disk lands in
+        :param col: The column's index
+        :return: None
+        """
+        disk = self.__canvas.create_image(self.__cell_position(0, col),
+                                          image=self.__disk_images[player],
+                                          anchor=tk.NW)
+        self.__disks[row, col] = disk
+        if row > 0:
+            self.__canvas.after(BoardCanvas.DROP_RATE, self.__fall, disk, 1,
+                                row, col)
+
+    def __fall(self, disk, row, last_row, col):
+        """
+        Show a frame of a falling disk, and schedule the next frame
+        :param disk: The canvas item of the disk
+        :param row: The row the disk is shown in in this frame
+        :param last_row: The row the disk lands in
+        :param col: The column's index
+        :return: None
+        """
+        self.__canvas.coords(disk, *self.__cell_position(row, col))
+        if row < last_row:
+            self.__canvas.after(BoardCanvas.DROP_RATE, self.__fall, disk,
+                                row + 1, last_row, col)
+
+    def highlight(self, cells, player):
+        """
+        Mark the disks of a winning streak
+        :param cells: A list of (row, col) tuples of the streak
+        :param player: An integer representing the winning player
+        :return: None
+        """
+        for cell in cells:
+            self.__canvas.itemconfigure(self.__disks[cell],
+                                        image=self.__win_images[player])
@@ -1,4 +1,6 @@
+import errno
 import socket
+import tkinter as tk
 
 
 class Communicator:
@@ -8,6 +10,11 @@ class Communicator:
     can be anticipated (after an initial connection has been created) and
     acted upon. The initial connection needs to be explicitly created by
     invoking connect(), which attempts establishment in a non blocking way.
+    Where tkinter supports file handlers, the sockets are registered with the
+    main loop, so connections and messages are handled as soon as they
+    arrive. Elsewhere, the sockets are polled upon regular intervals.
+    Messages are framed by a delimiter, so several messages arriving in a
+    single read (or one message split over several reads) are told apart.
     """
 
     WAIT_PERIOD = 100       # The wait period between two read attempts.
@@ -16,6 +23,10 @@ class Communicator:
                             # low value to create a connection "chance" (will
                             # not happen if simply set to non blocking), but
                             # without interfering the mainloop flow.
+    MESSAGE_DELIMITER = b"\n"  # Terminates every message on the wire.
+    ENCODING = "utf-8"
+    CONNECT_IN_PROGRESS = (0, errno.EINPROGRESS, errno.EWOULDBLOCK,
+                           errno.EALREADY)
 
     def __init__(self, root, port, ip=None):
         """
@@ -32,6 +43,11 @@ class Communicator:
         self.__socket = None
         self.__bound_func = None
         self.__server_socket = None
+        self.__received = b""       # Received bytes of incomplete messages.
+        self.__unsent = b""         # Framed messages not yet sent.
+        self.__handler_mask = None
+        # tkinter only supports file handlers on unix-like systems
+        self.__event_driven = hasattr(root.tk, "createfilehandler")
         # This means this communicator is a server communicator and is
         # responsible for trying and listening for an incoming connection.
         if self.__ip is None:
@@ -51,6 +67,13 @@ class Communicator:
         """
         if self.__socket:
             return
+        if self.__event_driven:
+            if self.__server_socket is not None:
+                self.__root.tk.createfilehandler(
+                    self.__server_socket, tk.READABLE, self.__accept)
+            else:
+                self.__start_connect()
+            return
         try:
             # This is the server communicator, try and accept connections.
             if self.__server_socket is not None:
@@ -73,6 +96,93 @@ class Communicator:
             # Try again in a given interval.
             self.__root.after(self.WAIT_PERIOD, self.connect)
 
+    def __accept(self, server_socket, mask):
+        """
+        Accept an incoming connection, once the listening socket is readable.
+        :param server_socket: the listening socket.
+        :param mask: the tkinter file event mask.
+        :return: None.
+        """
+        try:
+            connection, _ = server_socket.accept()
+        except socket.error:
+            return
+        self.__root.tk.deletefilehandler(server_socket)
+        server_socket.close()
+        connection.setblocking(0)
+        self.__on_connected(connection)
+
+    def __start_connect(self):
+        """
+        Start a non blocking connection attempt to the remote host, and
+        register to hear when it is done.
+        :return: None.
+        """
+        client_socket = socket.socket()
+        client_socket.setblocking(0)
+        error = client_socket.connect_ex((self.__ip, self.__port))
+        if error in self.CONNECT_IN_PROGRESS:
+            self.__root.tk.createfilehandler(client_socket, tk.WRITABLE,
+                                             self.__finish_connect)
+        else:
+            client_socket.close()
+            self.__root.after(self.WAIT_PERIOD, self.__start_connect)
+
+    def __finish_connect(self, client_socket, mask):
+        """
+        Complete a connection attempt once the socket is writable, or try
+        again in a given interval if it failed.
+        :param client_socket: the connecting socket.
+        :param mask: the tkinter file event mask.
+        :return: None.
+        """
+        self.__root.tk.deletefilehandler(client_socket)
+        error = client_socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error == 0:
+            self.__on_connected(client_socket)
+        else:
+            client_socket.close()
+            self.__root.after(self.WAIT_PERIOD, self.__start_connect)
+
+    def __on_connected(self, connection):
+        """
+        Start receiving messages once a connection has been established, and
+        send the messages waiting for it.
+        :param connection: the connected socket.
+        :return: None.
+        """
+        self.__socket = connection
+        self.__flush()
+
+    def __update_handler(self):
+        """
+        Register the connection socket with the main loop, for reading and
+        also for writing while there are unsent messages.
+        :return: None.
+        """
+        mask = tk.READABLE
+        if self.__unsent:
+            mask |= tk.WRITABLE
+        if mask != self.__handler_mask:
+            self.__root.tk.createfilehandler(self.__socket, mask,
+                                             self.__on_socket_event)
+            self.__handler_mask = mask
+
+    def __on_socket_event(self, connection, mask):
+        """
+        Send waiting messages as soon as the connection socket is writable,
+        and receive messages as soon as it is readable.
+        :param connection: the connected socket.
+        :param mask: the tkinter file event mask.
+        :return: None.
+        """
+        if mask & tk.WRITABLE:
+            self.__flush()
+        if mask & tk.READABLE and not self.__read_message():
+            # Don't register again - the remote host is closed. Close app.
+            self.__root.tk.deletefilehandler(connection)
+            self.__root.destroy()
+
     def bind_action_to_message(self, func):
         """
         Binds a specific function to the event of receiving a message.
@@ -83,16 +193,32 @@ class Communicator:
 
     def send_message(self, message):
         """
-        Sends a message via the socket (if a connection is established).
-        If the socket is not yet connected, does nothing (no retry).
-        :param message: the message to be sent.
+        Sends a message via the socket. If the socket is not yet connected,
+        or can't take the whole message at once, the rest of the message is
+        sent as soon as possible, in order.
+        :param message: the message to be sent. Its string representation must
+        not contain the message delimiter.
         :return: None.
         """
-        if not self.is_connected():
-            self.__root.after(self.WAIT_PERIOD, lambda: self.
-                              send_message(message))
-            return
-        self.__socket.send(str(message).encode())
+        self.__unsent += str(message).encode(self.ENCODING) + \
+            self.MESSAGE_DELIMITER
+        if self.is_connected():
+            self.__flush()
+
+    def __flush(self):
+        """
+        Send as much of the unsent messages as the socket takes without
+        blocking.
+        :return: None.
+        """
+        try:
+            if self.__unsent:
+                sent = self.__socket.send(self.__unsent)
+                self.__unsent = self.__unsent[sent:]
+        except socket.error:
+            pass
+        if self.__event_driven:
+            self.__update_handler()
 
     def is_connected(self):
         """
@@ -101,24 +227,40 @@ class Communicator:
         """
         return self.__socket is not None
 
+    def __read_message(self):
+        """
+        Try and receive data from the connection socket. If the data is empty,
+        it means the remote host was abruptly closed. Otherwise invoke a given
+        2nd order function on every message the data completes, in order.
+        :return: False if the remote host was closed, True otherwise.
+        """
+        try:
+            data = self.__socket.recv(Communicator.BUFFER_SIZE)
+        except socket.error:
+            return True
+        if len(data) == 0:
+            return False
+        *messages, self.__received = \
+            (self.__received + data).split(self.MESSAGE_DELIMITER)
+        for message in messages:
+            if self.__bound_func is not None:
+                self.__bound_func(message.decode(self.ENCODING))
+        return True
+
     def __get_message(self):
         """
         Upon regular intervals, try and receive a message from the connection
-        socket (if established). If the message is empty, it means the remote
-        host was abruptly closed, so do nothing. Otherwise invoke a given 2nd
-        order function on the received message. If no message was made
-        available, the method re-tries after a fixed interval.
+        socket (if established). If no message was made available, the method
+        re-tries after a fixed interval. With file handlers, the connection is
+        not polled, as it is registered with the main loop once established.
         :return: None.
         """
+        if self.__event_driven:
+            return
         if self.is_connected():
-            try:
-                message = self.__socket.recv(Communicator.BUFFER_SIZE).decode()
-                # Don't register again - the remote host is closed. Close app.
-                if len(message) == 0:
-                    self.__root.destroy()
-                    return
-                if self.__bound_func is not None:
-                    self.__bound_func(message)
-            except socket.error:
-                pass
-        self.__root.after(self.WAIT_PERIOD, self.__get_message)
\ No newline at end of file
+            self.__flush()
+        if self.is_connected() and not self.__read_message():
+            # Don't register again - the remote host is closed. Close app.
+            self.__root.destroy()
+            return
+        self.__root.after(self.WAIT_PERIOD, self.__get_message)
\ No newline at end of file
@@ -0,0 +1,117 @@
+from game import Game
+from ai import AI
+from search_stats import SearchStats
+import multiprocessing
+import random
+import sys
+
+
+USAGE = "Usage: depth_benchmark.py <positions> <seconds> [workers]\n" \
+        "Compares the search depth a serial and a parallel ai reach in the " \
+        "same time, from random positions"
+MIN_ARGUMENTS = 3
+MAX_ARGUMENTS = 4
+POSITIONS_ARGUMENT = 1
+SECONDS_ARGUMENT = 2
+WORKERS_ARGUMENT = 3
+MAX_OPENING_MOVES = 14
+RESULT_FORMAT = "%-40s serial: depth %2d, %8d nodes  " \
+                "parallel: depth %2d, %8d nodes  same depth nodes: %d / %d"
+
+
+def random_position(seed, max_moves=MAX_OPENING_MOVES):
+    """
+    Play random moves from the start of a game
+    :param seed: The seed of the random moves
+    :param max_moves: The maximal number of moves to play
+    :return: A Game object, whose game is still on
+    """
+    moves = random.Random(seed)
+    while True:
+        g = Game()
+        for _ in range(moves.randint(0, max_moves)):
+            g.make_move(moves.choice(list(g.get_legal_moves())))
+            if g.get_winner() is not None:
+                break
+        if g.get_winner() is None:
+            return g
+
+
+def search(ai, g, timeout):
+    """
+    Search a position with a time limit
+    :param ai: The AI object to search with
+    :param g: Game object
+    :param timeout: A float representing a time limit in seconds
+    :return: A list of (turns ahead, seconds, nodes) tuples, one per
+    completed search depth
+    """
+    ai.find_legal_move(g, lambda move: None, timeout)
+    return ai.get_stats().get_iterations()
+
+
+def compare_depths(positions, timeout, workers=None):
+    """
+    Search random positions with a serial ai and a parallel one, with the
+    same time limit. Both ais search a small position first, so the worker
+    processes are already running when the parallel ai is timed
+    :param positions: The number of positions to search
+    :param timeout: A float representing a time limit per position in seconds
+    :param workers: The number of processes of the parallel ai, one per cpu
+    if None
+    :return: A list holding for every position a tuple (moves, serial,
+    parallel), where moves lists the columns played to reach the position
+    and serial and parallel are the ais' lists of (turns ahead, seconds,
+    nodes) tuples, one per completed search depth
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    results = []
+    for seed in range(positions):
+        g = random_position(seed)
+        serial, parallel = AI(), AI(workers=workers)
+        for ai in (serial, parallel):
+            ai.find_legal_move(Game(), lambda move: None,
+                               turns_ahead=AI.MIN_TURNS_AHEAD)
+        try:
+            results.append((g.get_moves(), search(serial, g, timeout),
+                            search(parallel, g, timeout)))
+        finally:
+            parallel.close()
+    return results
+
+
+def main(argv):
+    """
+    Compare search depths as specified by program arguments, and print the
+    results
+    :param argv: A list of arguments
+    :return: None
+    """
+    if not MIN_ARGUMENTS <= len(argv) <= MAX_ARGUMENTS:
+        print(USAGE)
+        return
+    workers = None
+    if len(argv) == MAX_ARGUMENTS:
+        workers = int(argv[WORKERS_ARGUMENT])
+    deeper = 0
+    results = compare_depths(int(argv[POSITIONS_ARGUMENT]),
+                             float(argv[SECONDS_ARGUMENT]), workers)
+    for moves, serial, parallel in results:
+        depths = [dict((iteration[SearchStats.DEPTH],
+                        iteration[SearchStats.NODES])
+                       for iteration in iterations)
+                  for iterations in (serial, parallel)]
+        common = min(max(depths[0], default=0), max(depths[1], default=0))
+        print(RESULT_FORMAT % (
+            "".join(map(str, moves)) or "(empty board)",
+            max(depths[0], default=0), sum(depths[0].values()),
+            max(depths[1], default=0), sum(depths[1].values()),
+            depths[0].get(common, 0), depths[1].get(common, 0)))
+        deeper += max(depths[1], default=0) > max(depths[0], default=0)
+    print("parallel searched deeper in %d of %d positions" %
+          (deeper, len(results)))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
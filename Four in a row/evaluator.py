@@ -0,0 +1,109 @@
+class Evaluator:
+    """
+    A class estimating how good a position in a game of four in a row is,
+    for positions which aren't searched to the end of the game. Every line of
+    "win length" cells on the board (a window) that holds disks of only one
+    player is a possible win for that player, worth more the more disks it
+    already holds, so open threes count far more than single disks. Central
+    cells lie in more windows than edge cells, so central disks are worth
+    more. The score is kept up to date as disks are added and removed, so
+    reading it costs nothing
+    """
+
+    PLAYERS = 2
+    # the worth of a window holding a given number of disks of one player is
+    # THREAT_BASE to the power of the number of disks minus one
+    THREAT_BASE = 4
+    # windows are shared by all boards of the same size and win length
+    __windows = {}
+
+    def __init__(self, height, width, win_length):
+        """
+        Constructor for evaluator object
+        :param height: the height of the board
+        :param width: the width of the board
+        :param win_length: the length of a winning streak
+        """
+        self.__width = width
+        self.__cell_windows, window_count = \
+            Evaluator.__get_windows(height, width, win_length)
+        self.__counts = [[0] * window_count for _ in range(Evaluator.PLAYERS)]
+        # values[a][b] is the worth of a window holding a disks of the first
+        # player and b disks of the second, for the first player
+        self.__values = [[0] * (win_length + 1) for _ in range(win_length + 1)]
+        for disks in range(1, win_length + 1):
+            worth = Evaluator.THREAT_BASE ** (disks - 1)
+            self.__values[disks][0] = worth
+            self.__values[0][disks] = -worth
+        self.__score = 0
+
+    @staticmethod
+    def __get_windows(height, width, win_length):
+        """
+        Find all windows of a board
+        :param height: the height of the board
+        :param width: the width of the board
+        :param win_length: the length of a winning streak
+        :return: A tuple of a list with the indices of the windows holding
+        each cell (by row * width + col), and the number of windows
+        """
+        size = height, width, win_length
+        if size not in Evaluator.__windows:
+            cell_windows = [[] for _ in range(height * width)]
+            window = 0
+            for row_step, col_step in ((1, 0), (0, 1), (-1, 1), (1, 1)):
+                for row in range(height):
+                    for col in range(width):
+                        last_row = row + row_step * (win_length - 1)
+                        last_col = col + col_step * (win_length - 1)
+                        if not (0 <= last_row < height and
+                                0 <= last_col < width):
+                            continue
+                        for i in range(win_length):
+                            cell_windows[(row + row_step * i) * width +
+                                         col + col_step * i].append(window)
+                        window += 1
+            Evaluator.__windows[size] = cell_windows, window
+        return Evaluator.__windows[size]
+
+    def add(self, player, row, col):
+        """
+        Update the score after a disk was added to the board
+        :param player: An integer representing the player
+        :param row: Row index of the disk
+        :param col: Column index of the disk
+        :return: None
+        """
+        first, second = self.__counts
+        values = self.__values
+        counts = self.__counts[player]
+        for window in self.__cell_windows[row * self.__width + col]:
+            old = values[first[window]][second[window]]
+            counts[window] += 1
+            self.__score += values[first[window]][second[window]] - old
+
+    def remove(self, player, row, col):
+        """
+        Update the score after a disk was removed from the board
+        :param player: An integer representing the player
+        :param row: Row index of the disk
+        :param col: Column index of the disk
+        :return: None
+        """
+        first, second = self.__counts
+        values = self.__values
+        counts = self.__counts[player]
+        for window in self.__cell_windows[row * self.__width + col]:
+            old = values[first[window]][second[window]]
+            counts[window] -= 1
+            self.__score += values[first[window]][second[window]] - old
+
+    def get_score(self, player):
+        """
+        :param player: An integer representing the player
+        :return: An integer, positive if the position favours the player and
+        negative if it favours the opponent
+        """
+        if player == 0:
+            return self.__score
+        return -self.__score
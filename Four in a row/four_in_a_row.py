@@ -7,11 +7,14 @@ NUM_ARGUMENTS = 3
 PLAYER_ARGUMENT = 1
 PORT_ARGUMENT = 2
 IP_ARGUMENT = 3
-VALID_PLAYERS = ["human", "ai"]
+VALID_PLAYERS = ["human", "ai", "solver"]
 ILLEGAL_ARGS = "Illegal program arguments"
 MAX_PORT = 65535
 P1 = "Player1"
 P2 = "Player2"
+# an optional argument, logging the game to a record file and resuming the
+# last game logged there if it was interrupted
+RECORD_OPTION = "--record="
 
 
 def check_args(argv):
@@ -28,8 +31,22 @@ def check_args(argv):
     return True
 
 
+def pop_record_path(argv):
+    """
+    Remove the record option from the arguments, if given
+    :param argv: A list of arguments
+    :return: The path of the record file, None if the option wasn't given
+    """
+    for arg in argv:
+        if arg.startswith(RECORD_OPTION):
+            argv.remove(arg)
+            return arg[len(RECORD_OPTION):]
+    return None
+
+
 if __name__ == '__main__':
     args = sys.argv
+    record_path = pop_record_path(args)
     if check_args(args):
         root = tk.Tk()
         args[PLAYER_ARGUMENT] = VALID_PLAYERS.index(args[PLAYER_ARGUMENT])
@@ -39,5 +56,5 @@ if __name__ == '__main__':
             root.title(P1)
         else:
             root.title(P2)
-        game = GUI(root, *act_args)
+        game = GUI(root, *act_args, record_path=record_path)
         root.mainloop()
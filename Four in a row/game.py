@@ -1,4 +1,5 @@
 from board import Board
+from bitboard import BitBoard
 
 
 class Game:
@@ -7,7 +8,9 @@ class Game:
      "board", which is a Board object for keeping track of the game's
      advancement; "turn", an integer representing the current turn; "winner",
      which states who won the game, and "winning streak", which indicates
-     the board coordinates of the game winning disk streak
+     the board coordinates of the game winning disk streak, and "moves", the
+     columns of all moves made so far. The board's size and the streak length
+     needed to win may be chosen per game
     """
 
     PLAYER_ONE = 0
@@ -15,17 +18,38 @@ class Game:
     DRAW = 2
     HEIGHT = 6
     WIDTH = 7
+    WIN_LENGTH = Board.WIN_LENGTH
     LAST_TURN = HEIGHT * WIDTH + 1
     GAME_END_ERROR = "Illegal move"
+    GAME_START_ERROR = "No move to undo"
+    UNDO_COLUMN_ERROR = "The last move wasn't made in column %d"
 
-    def __init__(self):
+    def __init__(self, bitboard=False, height=HEIGHT, width=WIDTH,
+                 win_length=WIN_LENGTH, board=None):
         """
         Constructor for game object
+        :param bitboard: True to keep the game on a compact BitBoard, which is
+        much faster to update and check for wins, False for a regular Board
+        :param height: the height of the board
+        :param width: the width of the board
+        :param win_length: the length of a winning streak
+        :param board: A Board or BitBoard of the game's size to keep the game
+        on, instead of a new empty one (bitboard is then ignored)
         """
         self.__turn = 1
-        self.__board = Board(Game.HEIGHT, Game.WIDTH)
+        self.__height = height
+        self.__width = width
+        self.__win_length = win_length
+        self.__last_turn = height * width + 1
+        if board is not None:
+            self.__board = board
+        elif bitboard:
+            self.__board = BitBoard(height, width, win_length)
+        else:
+            self.__board = Board(height, width, win_length)
         self.__winner = None
         self.__winning_streak = None
+        self.__moves = []
 
     def make_move(self, column):
         """
@@ -40,16 +64,64 @@ class Game:
         else:
             player = Game.PLAYER_ONE
         self.__board.add_to_col(player, column)
+        self.__moves.append(column)
         self.__turn += 1
-        for direction in Board.DIRECTIONS:
-            streak = self.__board.search_streak(column, direction, player)
-            if streak is not None:
-                self.__winner = player
-                self.__winning_streak = streak
-                break
-        else:
-            if self.__turn == Game.LAST_TURN:
-                self.__winner = Game.DRAW
+        streak = self.__board.find_streak(column, player)
+        if streak is not None:
+            self.__winner = player
+            self.__winning_streak = streak
+        elif self.__turn == self.__last_turn:
+            self.__winner = Game.DRAW
+
+    def undo_move(self, column=None):
+        """
+        Take back the last move. Together with make_move, this lets a single
+        game object be explored move by move without copying it
+        :param column: The column's index of the last move, which is checked
+        if given
+        :return: None
+        """
+        if self.__turn == 1:
+            raise RuntimeError(Game.GAME_START_ERROR)
+        last_column = self.__moves[-1]
+        if column is not None and column != last_column:
+            raise ValueError(Game.UNDO_COLUMN_ERROR % column)
+        self.__moves.pop()
+        self.__board.remove_from_col(last_column)
+        self.__turn -= 1
+        # no move can be made after the game ended, so the game was still on
+        # before the last move
+        self.__winner = None
+        self.__winning_streak = None
+
+    def get_legal_moves(self, order=None):
+        """
+        Generate the columns in which a move can currently be made
+        :param order: An iterable of column indices to check, in the order
+        they should be generated. All columns, left to right, if None
+        :return: A generator of column indices
+        """
+        if self.__winner is not None:
+            return
+        if order is None:
+            order = range(self.__width)
+        for column in order:
+            if self.__board.can_add_to_col(column):
+                yield column
+
+    def get_bitboard_copy(self):
+        """
+        :return: A copy of the game in its current state, kept on a BitBoard
+        """
+        board = BitBoard.from_cells(self.__board.get_cells(),
+                                    self.__win_length)
+        copy = Game(True, self.__height, self.__width, self.__win_length,
+                    board)
+        copy.__turn = self.__turn
+        copy.__moves = list(self.__moves)
+        copy.__winner = self.__winner
+        copy.__winning_streak = self.__winning_streak
+        return copy
 
     def get_winner(self):
         """
@@ -83,12 +155,42 @@ class Game:
         """
         return self.__winning_streak
 
+    def get_moves(self):
+        """
+        :return: A list of the columns of all moves made so far, in order
+        """
+        return list(self.__moves)
+
     def get_board(self):
         """
         :return: The game's board object
         """
         return self.__board
 
+    def get_height(self):
+        """
+        :return: The height of the game's board
+        """
+        return self.__height
+
+    def get_width(self):
+        """
+        :return: The width of the game's board
+        """
+        return self.__width
+
+    def get_win_length(self):
+        """
+        :return: The length of a winning streak
+        """
+        return self.__win_length
+
+    def get_last_turn(self):
+        """
+        :return: The turn following the game's last possible move
+        """
+        return self.__last_turn
+
     def get_turn(self):
         """
         :return: An integer representing current turn
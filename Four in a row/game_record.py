@@ -0,0 +1,148 @@
+from game import Game
+import struct
+
+
+MAGIC = b"FIRG"
+HEADER = struct.Struct("<4sBBB")
+END = 255  # Marks the end of a finished game, never a column index.
+CHUNK_SIZE = 1 << 20  # The number of bytes read at once when replaying.
+FORMAT_ERROR = "Not a game record file"
+VARIANT_ERROR = "The record holds games of a different board or streak length"
+WIDTH_ERROR = "Columns of a board %d wide don't fit in a byte"
+
+
+class GameRecord:
+    """
+    An append only log of played games. A record file starts with a header
+    holding the board size and the winning streak length of its games,
+    followed by the games one after the other: one byte per move, holding
+    the move's column, and an END byte after the last move of every finished
+    game. Moves are written as soon as they're made, so after a crash the
+    moves following the last END byte are the game that was interrupted
+    """
+
+    def __init__(self, path, height=Game.HEIGHT, width=Game.WIDTH,
+                 win_length=Game.WIN_LENGTH):
+        """
+        Constructor for game record object. Opens a record file for
+        appending, creating it if needed
+        :param path: the path of the record file
+        :param height: the height of the recorded games' boards
+        :param width: the width of the recorded games' boards
+        :param win_length: the length of a winning streak
+        """
+        if width >= END:
+            raise ValueError(WIDTH_ERROR % width)
+        self.__file = open(path, "ab")
+        if self.__file.tell() == 0:
+            self.__file.write(HEADER.pack(MAGIC, height, width, win_length))
+            self.__file.flush()
+        elif read_header(path) != (height, width, win_length):
+            self.close()
+            raise ValueError(VARIANT_ERROR)
+
+    def add_move(self, column):
+        """
+        Record a move of the current game
+        :param column: The column's index
+        :return: None
+        """
+        self.__file.write(bytes((column,)))
+        self.__file.flush()
+
+    def end_game(self):
+        """
+        Record the end of the current game, so the next move starts a new one
+        :return: None
+        """
+        self.__file.write(bytes((END,)))
+        self.__file.flush()
+
+    def close(self):
+        """
+        Release the record file
+        :return: None
+        """
+        self.__file.close()
+
+
+def read_header(path):
+    """
+    Read the header of a record file
+    :param path: the path of the record file
+    :return: A tuple (height, width, win_length) of the recorded games
+    """
+    with open(path, "rb") as record_file:
+        header = record_file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(FORMAT_ERROR)
+    magic, height, width, win_length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(FORMAT_ERROR)
+    return height, width, win_length
+
+
+def read_games(path, chunk_size=CHUNK_SIZE):
+    """
+    Read the finished games of a record file. The file is read in chunks, so
+    records of any size can be streamed
+    :param path: the path of the record file
+    :param chunk_size: the number of bytes to read at once
+    :return: A generator of the games, each a bytes object holding the
+    columns of its moves
+    """
+    read_header(path)
+    with open(path, "rb") as record_file:
+        record_file.seek(HEADER.size)
+        unfinished = b""
+        chunk = record_file.read(chunk_size)
+        while chunk:
+            games = (unfinished + chunk).split(bytes((END,)))
+            unfinished = games.pop()
+            yield from games
+            chunk = record_file.read(chunk_size)
+
+
+def read_unfinished_game(path, chunk_size=CHUNK_SIZE):
+    """
+    Read the moves of the last game of a record file if it didn't finish.
+    Only the end of the file is read
+    :param path: the path of the record file
+    :param chunk_size: the number of bytes to read at once
+    :return: A list of the columns of the game's moves, or None if the last
+    game finished
+    """
+    read_header(path)
+    with open(path, "rb") as record_file:
+        end = record_file.seek(0, 2)
+        moves = b""
+        while end > HEADER.size:
+            start = max(end - chunk_size, HEADER.size)
+            record_file.seek(start)
+            chunk = record_file.read(end - start)
+            last_end = chunk.rfind(bytes((END,)))
+            if last_end >= 0:
+                moves = chunk[last_end + 1:] + moves
+                break
+            moves = chunk + moves
+            end = start
+    if not moves:
+        return None
+    return list(moves)
+
+
+def replay(moves, height=Game.HEIGHT, width=Game.WIDTH,
+           win_length=Game.WIN_LENGTH, bitboard=True):
+    """
+    Replay the moves of a recorded game
+    :param moves: An iterable of the columns of the game's moves
+    :param height: the height of the game's board
+    :param width: the width of the game's board
+    :param win_length: the length of a winning streak
+    :param bitboard: True to replay on a BitBoard, which is much faster
+    :return: A Game object in the state following the moves
+    """
+    g = Game(bitboard, height, width, win_length)
+    for move in moves:
+        g.make_move(move)
+    return g
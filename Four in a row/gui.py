@@ -1,6 +1,11 @@
 from communicator import Communicator
 from game import Game
 from ai import AI
+from ai_worker import AIWorker
+from solver import Solver
+from board_canvas import BoardCanvas
+from game_record import GameRecord, read_unfinished_game
+import os
 import tkinter as tk
 
 
@@ -16,6 +21,8 @@ class GUI:
     FONT = ("times", 24)
     HUMAN = 0
     AI = 1
+    SOLVER = 2
+    SOLVER_TIMEOUT = 1.0  # The time limit of a solver ai's move (s).
     MSG_COLOR = "blue"
     EMPTY_CELL_IMG = 0
     PLAYER1_CELL_IMG = 1
@@ -23,34 +30,38 @@ class GUI:
     PLAYER1_WIN_DISK = 3
     PLAYER2_WIN_DISK = 4
     WINDOW_SIZE = 500
-    BOARD_HEIGHT = 6
-    BOARD_WIDTH = 7
     P1 = "Player 1"
     P2 = "Player 2"
     HOLD_MSG = "Please wait for %s to finnish their turn"
     DRAW = "No more moves. Game ended with a draw"
     WIN = "%s won!"
+    THINKING_MSG = "Thinking... column %d looks best so far"
     DEFAULT_MSG = ""
     TOP = 0
-    DROP_RATE = 100
 
-    def __init__(self, root, player, port, ip=None):
+    def __init__(self, root, player, port, ip=None, height=Game.HEIGHT,
+                 width=Game.WIDTH, win_length=Game.WIN_LENGTH,
+                 record_path=None):
         """
         Initialize GUI and connect the communicator
         :param root: The tkinter root
-        :param player: An integer representing if the player is human or ai
+        :param player: An integer representing if the player is human, ai or
+        the stronger solver ai
         :param port: The port to connect to
         :param ip: The ip to connect to
+        :param height: the height of the board
+        :param width: the width of the board
+        :param win_length: the length of a winning streak
+        :param record_path: The path of a game record file to log the game
+        to. If the last game logged there didn't finish, it is resumed
         """
         self.__root = root
-        self.__game = Game()
+        self.__game = Game(height=height, width=width, win_length=win_length)
         self.__bottoms = self.__game.get_board().get_bottoms()
         self.__communicator = Communicator(root, port, ip)
         self.__communicator.connect()
         self.__communicator.bind_action_to_message(self.__handle_message)
-        self.__top_frame = tk.Frame(self.__root)
-        self.__top_frame.pack()
-        self.__col_frames = []
+        self.__board_canvas = None
         self.__buttons = []
         self.__player = GUI.P1
         self.__opponent = GUI.P2
@@ -62,16 +73,41 @@ class GUI:
         self.__load_images()
         self.__place_widgets()
         self.__ai = None
+        self.__ai_worker = None
+        self.__ai_timeout = None
         if player == GUI.AI:
             self.__ai = AI()
-        self.__start_game()
+        elif player == GUI.SOLVER:
+            self.__ai = AI(solver=Solver())
+            self.__ai_timeout = GUI.SOLVER_TIMEOUT
+        if self.__ai is not None:
+            self.__ai_worker = AIWorker(root, self.__ai)
+        self.__record = None
+        resumed_moves = None
+        if record_path is not None:
+            if os.path.exists(record_path):
+                resumed_moves = read_unfinished_game(record_path)
+            self.__record = GameRecord(record_path, height, width, win_length)
+        self.__start_game(resumed_moves)
 
-    def __start_game(self):
+    def __start_game(self, resumed_moves=None):
         """
-        Allow player one to make a move
+        Allow the player whose turn it is to make a move
+        :param resumed_moves: A list of the columns of the moves made before
+        the game was interrupted, None for a new game
         :return: None
         """
+        for move in resumed_moves or []:
+            self.__place_disk(move)
+        winner = self.__game.get_winner()
+        if winner is not None:
+            self.__handle_win(winner)
+            return
         if self.__player == GUI.P1:
+            player = Game.PLAYER_ONE
+        else:
+            player = Game.PLAYER_TWO
+        if self.__game.get_current_player() == player:
             if self.__ai is not None:
                 self.__ai_play()
             else:
@@ -84,18 +120,23 @@ class GUI:
         Place widgets in the gui
         :return: None
         """
-        for col in range(GUI.BOARD_WIDTH):
-            col_frame = tk.Frame(self.__top_frame)
-            col_frame.pack(side=tk.LEFT)
-            self.__col_frames.append(col_frame)
-            for row in range(GUI.BOARD_HEIGHT):
-                cell = tk.Label(col_frame,
-                                image=self.__images[GUI.EMPTY_CELL_IMG])
-                cell.grid(row=row)
-            col_button = tk.Button(col_frame, text=str(col + 1),
+        self.__board_canvas = BoardCanvas(
+            self.__root, self.__game.get_height(), self.__game.get_width(),
+            self.__images[GUI.EMPTY_CELL_IMG],
+            [self.__images[GUI.PLAYER1_CELL_IMG],
+             self.__images[GUI.PLAYER2_CELL_IMG]],
+            [self.__images[GUI.PLAYER1_WIN_DISK],
+             self.__images[GUI.PLAYER2_WIN_DISK]])
+        self.__board_canvas.pack(before=self.__msg_board)
+        button_frame = tk.Frame(self.__root)
+        button_frame.pack(before=self.__msg_board)
+        for col in range(self.__game.get_width()):
+            button_frame.grid_columnconfigure(
+                col, minsize=self.__board_canvas.get_cell_width())
+            col_button = tk.Button(button_frame, text=str(col + 1),
                                    command=lambda column=col: self.__play_col(
                                        column), state=tk.DISABLED)
-            col_button.grid(row=GUI.BOARD_HEIGHT)
+            col_button.grid(row=0, column=col)
             self.__buttons.append(col_button)
 
     def __load_images(self):
@@ -116,21 +157,9 @@ class GUI:
         """
         self.__update_msg(GUI.DEFAULT_MSG)
         self.__change_buttons_state(tk.DISABLED)
-        player = self.__game.get_current_player()
-        frame = self.__col_frames[col]
-        if self.__game.get_current_player() == Game.PLAYER_ONE:
-            new_img = self.__images[GUI.PLAYER1_CELL_IMG]
-        else:
-            new_img = self.__images[GUI.PLAYER2_CELL_IMG]
-        self.__game.make_move(col)
-        bottom = self.__bottoms[col] + 1
-        if bottom == GUI.TOP:
-            self.__buttons[col] = None
-        for cell_index in range(bottom):
-            cell = frame.grid_slaves(row=cell_index)[0]
-            self.__disk_through_cell(cell, player)
-        last_cell = frame.grid_slaves(row=bottom)[0]
-        last_cell.configure(image=new_img)
+        self.__place_disk(col)
+        if self.__record is not None:
+            self.__record.add_move(col)
         winner = self.__game.get_winner()
         if report:
             self.__communicator.send_message(col)
@@ -139,6 +168,19 @@ class GUI:
         if winner is not None:
             self.__handle_win(winner)
 
+    def __place_disk(self, col):
+        """
+        Make a move in a column and draw its disk, without reporting it
+        :param col: The column's index
+        :return: None
+        """
+        player = self.__game.get_current_player()
+        self.__game.make_move(col)
+        bottom = self.__bottoms[col] + 1
+        if bottom == GUI.TOP:
+            self.__buttons[col] = None
+        self.__board_canvas.drop(player, bottom, col)
+
     def __update_msg(self, msg):
         """
         Update the message widget with a new message
@@ -155,20 +197,18 @@ class GUI:
         """
         self.__change_buttons_state(tk.DISABLED)
         self.__buttons = []
+        if self.__ai_worker is not None:
+            self.__ai_worker.cancel()
+        if self.__record is not None:
+            self.__record.end_game()
         if winner == Game.DRAW:
             self.__update_msg(GUI.DRAW)
             return
         elif winner == Game.PLAYER_ONE:
             msg = GUI.WIN % GUI.P1
-            img = self.__images[GUI.PLAYER1_WIN_DISK]
         else:
             msg = GUI.WIN % GUI.P2
-            img = self.__images[GUI.PLAYER2_WIN_DISK]
-        for cell in self.__game.get_wining_streak():
-            row, col = cell
-            frame = self.__col_frames[col]
-            cell_widget = frame.grid_slaves(row=row)[0]
-            cell_widget.configure(image=img)
+        self.__board_canvas.highlight(self.__game.get_wining_streak(), winner)
         self.__update_msg(msg)
 
     def __handle_message(self, move):
@@ -187,11 +227,16 @@ class GUI:
 
     def __ai_play(self):
         """
-        Make a play with the ai
+        Make a play with the ai. The ai searches in the background, and the
+        move is played once found, so the gui and the communicator keep
+        running meanwhile
         :return: None
         """
         if self.__game.get_winner() is None:
-            self.__ai.find_legal_move(self.__game, self.__play_col)
+            self.__ai_worker.start(
+                self.__game, self.__play_col,
+                lambda move: self.__update_msg(GUI.THINKING_MSG % (move + 1)),
+                self.__ai_timeout)
 
     def __change_buttons_state(self, state):
         """
@@ -204,20 +249,3 @@ class GUI:
                 button.configure(state=state)
             except AttributeError:
                 continue
-
-    def __disk_through_cell(self, cell, player=None):
-        """
-        Animate a disk going through an empty cell
-        :param cell: The cell
-        :param player: The player whose disk is dropping
-        :return: None
-        """
-        if player is not None:
-            if player == Game.PLAYER_ONE:
-                cell.configure(image=self.__images[GUI.PLAYER1_CELL_IMG])
-            else:
-                cell.configure(image=self.__images[GUI.PLAYER2_CELL_IMG])
-            cell.update()
-            cell.after(GUI.DROP_RATE, self.__disk_through_cell(cell))
-        else:
-            cell.configure(image=self.__images[GUI.EMPTY_CELL_IMG])
@@ -0,0 +1,172 @@
+from game import Game
+from ai import AI
+from solver import Solver
+import mmap
+import struct
+import sys
+
+
+USAGE = "Usage: opening_book.py <book path> <max ply> [turns ahead]\n" \
+        "Pass \"solver\" instead of the turns ahead for a book of exact moves"
+MIN_ARGUMENTS = 3
+MAX_ARGUMENTS = 4
+SOLVER_ARGUMENT = "solver"
+
+
+class OpeningBook:
+    """
+    A read only book of the best moves in the opening positions of a game of
+    four in a row. A book file starts with a header holding the board size,
+    the winning streak length, whether the moves are exact (found by a
+    solver) or heuristic (found by a depth limited search) and the number of
+    positions, followed by one fixed size record per position: the
+    position's key (see BitBoard.get_key) and its best move.
+    Records are sorted by key, so the file is memory mapped and searched in
+    place, without being loaded
+    """
+
+    # books of older versions, whose headers had no streak length or no
+    # exactness flag, started with b"FIAR" or b"FIA2", so they're rejected
+    # rather than misread
+    MAGIC = b"FIA3"
+    HEADER = struct.Struct("<4sBBB?I")
+    RECORD = struct.Struct("<QB")
+    MAX_KEY_BITS = 64
+    FORMAT_ERROR = "Not an opening book file"
+    SIZE_ERROR = "Keys of a %dx%d board don't fit in a book record"
+
+    def __init__(self, path):
+        """
+        Constructor for opening book object
+        :param path: the path of a book file, as written by generate_book
+        """
+        with open(path, "rb") as book_file:
+            self.__map = mmap.mmap(book_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        if len(self.__map) < OpeningBook.HEADER.size or \
+                self.__map[:len(OpeningBook.MAGIC)] != OpeningBook.MAGIC:
+            self.close()
+            raise ValueError(OpeningBook.FORMAT_ERROR)
+        _, height, width, win_length, self.__exact, self.__size = \
+            OpeningBook.HEADER.unpack_from(self.__map)
+        self.__variant = height, width, win_length
+
+    def get_move(self, g):
+        """
+        Look up the best move of a game's current position
+        :param g: Game object
+        :return: The column of the best move, None if the position isn't in
+        the book
+        """
+        if (g.get_height(), g.get_width(), g.get_win_length()) != \
+                self.__variant:
+            return None
+        key = g.get_bitboard_copy().get_board().get_key()
+        low, high = 0, self.__size
+        while low < high:
+            middle = (low + high) // 2
+            record_key, move = OpeningBook.RECORD.unpack_from(
+                self.__map, OpeningBook.HEADER.size +
+                middle * OpeningBook.RECORD.size)
+            if record_key == key:
+                return move
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def is_exact(self):
+        """
+        :return: True if the book's moves were found by a solver, False if
+        they were found by a depth limited search
+        """
+        return self.__exact
+
+    def close(self):
+        """
+        Release the book file
+        :return: None
+        """
+        self.__map.close()
+
+    def __len__(self):
+        """
+        :return: The number of positions in the book
+        """
+        return self.__size
+
+
+def collect_positions(g, max_ply, positions, moves):
+    """
+    Collect all ongoing positions reachable from a game within some moves
+    :param g: Game object kept on a BitBoard, left unchanged
+    :param max_ply: The number of moves to look ahead
+    :param positions: A dictionary to add positions to, mapping each key to
+    a list of moves reaching it from the start of the game
+    :param moves: The list of moves reaching the game's current position
+    :return: None
+    """
+    key = g.get_board().get_key()
+    if max_ply == 0 or g.get_winner() is not None or key in positions:
+        return
+    positions[key] = list(moves)
+    for move in g.get_legal_moves():
+        g.make_move(move)
+        moves.append(move)
+        collect_positions(g, max_ply - 1, positions, moves)
+        moves.pop()
+        g.undo_move(move)
+
+
+def generate_book(path, max_ply, turns_ahead=AI.DEFAULT_TURNS_AHEAD,
+                  height=Game.HEIGHT, width=Game.WIDTH,
+                  win_length=Game.WIN_LENGTH, solver=None):
+    """
+    Search the best move of every position of the first moves of a game, and
+    write them to a book file
+    :param path: The path of the book file to write
+    :param max_ply: The number of opening moves the book covers
+    :param turns_ahead: An integer representing the number of turns ahead
+    to search each position, when there's no solver
+    :param height: the height of the board
+    :param width: the width of the board
+    :param win_length: the length of a winning streak
+    :param solver: A Solver to find the exact best move of each position
+    with, for a book of exact moves. Solving opening positions of large
+    boards may take very long. A depth limited search is used if None
+    :return: The number of positions written
+    """
+    if (height + 1) * width > OpeningBook.MAX_KEY_BITS:
+        raise ValueError(OpeningBook.SIZE_ERROR % (height, width))
+    positions = {}
+    collect_positions(Game(True, height, width, win_length), max_ply,
+                      positions, [])
+    ai = AI(solver=solver)
+    records = []
+    for key in sorted(positions):
+        g = Game(True, height, width, win_length)
+        for move in positions[key]:
+            g.make_move(move)
+        best_moves = []
+        ai.find_legal_move(g, best_moves.append, turns_ahead=turns_ahead)
+        records.append(OpeningBook.RECORD.pack(key, best_moves[-1]))
+    with open(path, "wb") as book_file:
+        book_file.write(OpeningBook.HEADER.pack(
+            OpeningBook.MAGIC, height, width, win_length, solver is not None,
+            len(records)))
+        book_file.writelines(records)
+    return len(records)
+
+
+if __name__ == '__main__':
+    if not MIN_ARGUMENTS <= len(sys.argv) <= MAX_ARGUMENTS:
+        print(USAGE)
+    else:
+        options = {}
+        if len(sys.argv) == MAX_ARGUMENTS:
+            if sys.argv[-1] == SOLVER_ARGUMENT:
+                options["solver"] = Solver()
+            else:
+                options["turns_ahead"] = int(sys.argv[-1])
+        print(generate_book(sys.argv[1], int(sys.argv[2]), **options))
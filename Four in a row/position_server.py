@@ -0,0 +1,195 @@
+from game import Game
+from ai import AI
+from communicator import Communicator
+from transposition_table import TranspositionTable
+import multiprocessing
+import socketserver
+import sys
+import threading
+
+
+USAGE = "Usage: position_server.py <port> [workers] [turns ahead]"
+MIN_ARGUMENTS = 2
+MAX_ARGUMENTS = 4
+PORT_ARGUMENT = 1
+WORKERS_ARGUMENT = 2
+TURNS_AHEAD_ARGUMENT = 3
+
+
+class PositionServer:
+    """
+    A service finding the best moves of many games at once. A batch of
+    positions, each given as the list of moves played from the start of its
+    game, is answered with the best move of every position. The ais searching
+    the positions live as long as the server, so their transposition tables
+    are shared by all the games served instead of being rebuilt per game: a
+    single ai when serving serially, or one ai per worker process. A server
+    can also answer batches sent over a local socket, in the newline framed
+    format of Communicator messages: a request is a line of positions
+    separated by POSITION_SEPARATOR, each a list of columns separated by
+    MOVE_SEPARATOR, and the answer is a line of the best moves separated by
+    POSITION_SEPARATOR, with ERROR_REPLY in place of the moves of malformed
+    positions
+    """
+
+    POSITION_SEPARATOR = ";"
+    MOVE_SEPARATOR = ","
+    LOCALHOST = "127.0.0.1"
+    ERROR_REPLY = "error"
+
+    def __init__(self, workers=AI.SERIAL,
+                 table_size=TranspositionTable.DEFAULT_CAPACITY,
+                 turns_ahead=AI.DEFAULT_TURNS_AHEAD, timeout=None,
+                 height=Game.HEIGHT, width=Game.WIDTH,
+                 win_length=Game.WIN_LENGTH):
+        """
+        Constructor for position server object
+        :param workers: the number of processes searching positions, one per
+        cpu if None. With AI.SERIAL, positions are searched in this process
+        :param table_size: the maximal number of game states each ai caches
+        :param turns_ahead: An integer representing the number of turns ahead
+        to search each position
+        :param timeout: A float representing a time limit per position in
+        seconds, which overrides turns_ahead if given
+        :param height: the height of the served games' boards
+        :param width: the width of the served games' boards
+        :param win_length: the length of a winning streak
+        """
+        self.__search = turns_ahead, timeout, height, width, win_length
+        self.__pool = None
+        self.__ai = None
+        # a serial ai isn't safe to search from several connections at once
+        self.__lock = threading.Lock()
+        if workers == AI.SERIAL:
+            self.__ai = AI(table_size)
+        else:
+            self.__pool = multiprocessing.Pool(workers, _init_worker,
+                                               (table_size,))
+
+    def find_moves(self, positions):
+        """
+        Find the best move of every position of a batch
+        :param positions: A list of positions, each a list of the columns
+        played from the start of its game
+        :return: A list holding the best move of every position, or None for
+        positions where the game is over or one of the moves is illegal
+        """
+        tasks = [(moves,) + self.__search for moves in positions]
+        if self.__pool is not None:
+            return self.__pool.map(_find_move, tasks)
+        with self.__lock:
+            return [_find_move(task, self.__ai) for task in tasks]
+
+    def serve(self, port, ip=LOCALHOST):
+        """
+        Answer batches sent over a socket until interrupted
+        :param port: the port to listen on
+        :param ip: the ip to listen on
+        :return: None
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    reply = server.answer(line.rstrip(
+                        Communicator.MESSAGE_DELIMITER).decode(
+                        Communicator.ENCODING))
+                    self.wfile.write(reply.encode(Communicator.ENCODING) +
+                                     Communicator.MESSAGE_DELIMITER)
+
+        with socketserver.ThreadingTCPServer((ip, port), Handler) as tcp:
+            tcp.daemon_threads = True
+            tcp.serve_forever()
+
+    def answer(self, request):
+        """
+        Answer a single request message
+        :param request: A string of positions, as described by the class
+        :return: A string of best moves, where positions with no move are
+        left empty and malformed positions are answered with ERROR_REPLY
+        """
+        positions, replies = [], []
+        for position in request.split(PositionServer.POSITION_SEPARATOR):
+            try:
+                positions.append([int(move) for move in position.split(
+                    PositionServer.MOVE_SEPARATOR) if move])
+                replies.append(None)
+            except ValueError:
+                replies.append(PositionServer.ERROR_REPLY)
+        moves = iter(self.find_moves(positions))
+        for index, reply in enumerate(replies):
+            if reply is None:
+                move = next(moves)
+                replies[index] = "" if move is None else str(move)
+        return PositionServer.POSITION_SEPARATOR.join(replies)
+
+    def close(self):
+        """
+        Stop the worker processes, if any were started
+        :return: None
+        """
+        if self.__pool is not None:
+            self.__pool.terminate()
+            self.__pool.join()
+            self.__pool = None
+
+
+# the ai of a worker process, kept between batches so its table is reused
+_worker_ai = None
+
+
+def _init_worker(table_size):
+    """
+    Initialize a worker process of a position server
+    :param table_size: the maximal number of game states to cache
+    :return: None
+    """
+    global _worker_ai
+    _worker_ai = AI(table_size)
+
+
+def _find_move(task, ai=None):
+    """
+    Find the best move of a single position
+    :param task: A tuple (moves, turns_ahead, timeout, height, width,
+    win_length)
+    :param ai: The AI object to search with, the worker's ai if None
+    :return: The column of the best move, or None if the game is over or one
+    of the moves is illegal
+    """
+    moves, turns_ahead, timeout, height, width, win_length = task
+    if ai is None:
+        ai = _worker_ai
+    g = Game(True, height, width, win_length)
+    for move in moves:
+        if g.get_winner() is not None or not 0 <= move < width or \
+                not g.get_board().can_add_to_col(move):
+            return None
+        g.make_move(move)
+    if g.get_winner() is not None:
+        return None
+    found = []
+    if timeout is None:
+        ai.find_legal_move(g, found.append, turns_ahead=turns_ahead)
+    else:
+        ai.find_legal_move(g, found.append, timeout)
+    return found[-1] if found else None
+
+
+if __name__ == '__main__':
+    if not MIN_ARGUMENTS <= len(sys.argv) <= MAX_ARGUMENTS:
+        print(USAGE)
+    else:
+        options = {}
+        if len(sys.argv) > WORKERS_ARGUMENT:
+            options["workers"] = int(sys.argv[WORKERS_ARGUMENT])
+        if len(sys.argv) > TURNS_AHEAD_ARGUMENT:
+            options["turns_ahead"] = int(sys.argv[TURNS_AHEAD_ARGUMENT])
+        position_server = PositionServer(**options)
+        try:
+            position_server.serve(int(sys.argv[PORT_ARGUMENT]))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            position_server.close()
@@ -0,0 +1,134 @@
+class SearchStats:
+    """
+    A class summarizing the work of a single AI search. SearchStats objects
+    have attributes "nodes", the number of game states searched; "cutoffs",
+    a list counting the alpha-beta cutoffs caused by the move tried first,
+    second, etc. in a state; "hits" and "misses", the number of transposition
+    table lookups that found or didn't find their state; "table size", the
+    number of states in the table after the search; "iterations", a list of
+    (turns ahead, seconds, nodes) tuples, one per completed search depth, and
+    "seconds", the total duration of the search
+    """
+
+    DEPTH = 0
+    SECONDS = 1
+    NODES = 2
+
+    def __init__(self, nodes, cutoffs, hits, misses, table_size, iterations,
+                 seconds):
+        """
+        Constructor for search stats object
+        :param nodes: the number of game states searched
+        :param cutoffs: a list of cutoff counts by move index
+        :param hits: the number of table lookups that found their state
+        :param misses: the number of table lookups that didn't
+        :param table_size: the number of states in the table
+        :param iterations: a list of (turns ahead, seconds, nodes) tuples
+        :param seconds: the total duration of the search
+        """
+        self.__nodes = nodes
+        self.__cutoffs = cutoffs
+        self.__hits = hits
+        self.__misses = misses
+        self.__table_size = table_size
+        self.__iterations = iterations
+        self.__seconds = seconds
+
+    def get_nodes(self):
+        """
+        :return: The number of game states searched
+        """
+        return self.__nodes
+
+    def get_nodes_per_second(self):
+        """
+        :return: The number of game states searched per second
+        """
+        if self.__seconds == 0:
+            return 0.0
+        return self.__nodes / self.__seconds
+
+    def get_cutoffs(self):
+        """
+        :return: A list where index i holds the number of cutoffs caused by
+        the i-th move tried in a state. Most cutoffs should come from the
+        first move if moves are well ordered
+        """
+        return self.__cutoffs
+
+    def get_hits(self):
+        """
+        :return: The number of table lookups that found their state
+        """
+        return self.__hits
+
+    def get_misses(self):
+        """
+        :return: The number of table lookups that didn't find their state
+        """
+        return self.__misses
+
+    def get_hit_rate(self):
+        """
+        :return: The fraction of table lookups that found their state
+        """
+        lookups = self.__hits + self.__misses
+        if lookups == 0:
+            return 0.0
+        return self.__hits / lookups
+
+    def get_table_size(self):
+        """
+        :return: The number of states in the table after the search
+        """
+        return self.__table_size
+
+    def get_iterations(self):
+        """
+        :return: A list of (turns ahead, seconds, nodes) tuples, one per
+        completed search depth
+        """
+        return self.__iterations
+
+    def get_seconds(self):
+        """
+        :return: The total duration of the search in seconds
+        """
+        return self.__seconds
+
+    def get_branching_factor(self):
+        """
+        The effective branching factor is the average number of children
+        searched per state. With several completed depths it is the ratio
+        of the node counts of the last two, otherwise it is estimated from
+        the total node count and the depth
+        :return: A float, or None if no depth was completed
+        """
+        if not self.__iterations:
+            return None
+        if len(self.__iterations) > 1:
+            previous = self.__iterations[-2][SearchStats.NODES]
+            if previous > 0:
+                return self.__iterations[-1][SearchStats.NODES] / previous
+        depth, _, nodes = self.__iterations[-1]
+        if depth == 0 or nodes == 0:
+            return None
+        return nodes ** (1 / depth)
+
+    def to_dict(self):
+        """
+        :return: A dictionary of all the stats, suitable for structured
+        logging (e.g. as json)
+        """
+        return {"nodes": self.__nodes,
+                "seconds": self.__seconds,
+                "nodes_per_second": self.get_nodes_per_second(),
+                "cutoffs": list(self.__cutoffs),
+                "table_hits": self.__hits,
+                "table_misses": self.__misses,
+                "table_hit_rate": self.get_hit_rate(),
+                "table_size": self.__table_size,
+                "iterations": [{"turns_ahead": depth, "seconds": seconds,
+                                "nodes": nodes}
+                               for depth, seconds, nodes in self.__iterations],
+                "branching_factor": self.get_branching_factor()}
@@ -0,0 +1,300 @@
+from ai import AI
+from transposition_table import TranspositionTable
+import time
+
+
+class Solver:
+    """
+    A class finding the exact outcome of four in a row positions, by
+    searching them to the end of the game. Positions are kept as two bit
+    masks laid out like a BitBoard's: the disks of the player to move, and
+    all the disks on the board. The search never tries a move letting the
+    opponent win on their next move, plays a forced block when the opponent
+    threatens to win, and gives up a position at once when it holds two such
+    threats. The score of a position is found by a series of null window
+    searches (a window of width one only tells whether the score is above a
+    guess, so it is cut off far sooner), which narrow the possible scores
+    down until a single one remains. Scores follow the ai's rating
+    convention: a win is rated by the number of disks the winner didn't have
+    to play, a loss by minus the disks the opponent didn't have to play, and
+    a draw by 0
+    """
+
+    TIMEOUT_CHECK_PERIOD = 1024  # The number of states between time checks.
+    DRAW_SCORE = 0
+
+    def __init__(self, table_size=TranspositionTable.DEFAULT_CAPACITY):
+        """
+        Constructor for solver object
+        :param table_size: the maximal number of positions to cache. Cached
+        scores are exact, so they are kept between searches
+        """
+        self.__table = TranspositionTable(table_size)
+        self.__variant = None
+        self.__deadline = None
+        self.__timed_out = False
+        self.__cancelled = False
+        self.__nodes = 0
+
+    def __prepare(self, g):
+        """
+        Adapt the solver to the size of a game's board
+        :param g: Game object
+        :return: None
+        """
+        height, width = g.get_height(), g.get_width()
+        variant = height, width, g.get_win_length()
+        if variant == self.__variant:
+            return
+        self.__variant = variant
+        self.__table.clear()
+        self.__win_length = g.get_win_length()
+        self.__cells = height * width
+        self.__player_disks = g.get_last_turn() // 2
+        col_bits = height + 1
+        self.__bottom_mask = sum(1 << (col * col_bits)
+                                 for col in range(width))
+        self.__board_mask = self.__bottom_mask * ((1 << height) - 1)
+        self.__col_masks = [((1 << height) - 1) << (col * col_bits)
+                            for col in AI.get_move_order(width)]
+        # the shifts from a cell to the other cells of each line through it,
+        # for every place the cell may take in the line
+        self.__lines = []
+        for shift in (1, col_bits, col_bits + 1, col_bits - 1):
+            for place in range(self.__win_length):
+                self.__lines.append([(other - place) * shift for other in
+                                     range(self.__win_length)
+                                     if other != place])
+
+    def __win_score(self, turn):
+        """
+        :param turn: The turn of a winning move
+        :return: The score of the win, for the winner
+        """
+        return self.__player_disks - (turn + 1) // 2
+
+    def __winning_cells(self, disks, mask):
+        """
+        Find the empty cells which would complete a winning streak
+        :param disks: The bit mask of a player's disks
+        :param mask: The bit mask of all the disks on the board
+        :return: A bit mask of the cells
+        """
+        cells = 0
+        for line in self.__lines:
+            streak = self.__board_mask
+            for shift in line:
+                if shift > 0:
+                    streak &= disks >> shift
+                else:
+                    streak &= disks << -shift
+            cells |= streak
+        return cells & (self.__board_mask ^ mask)
+
+    def solve(self, g, timeout=None):
+        """
+        Find the exact score of a game's current position
+        :param g: Game object, whose game is still on
+        :param timeout: A float representing a time limit in seconds
+        :return: The score, for the player about to move, or None if the time
+        limit passed (or the search was cancelled) before it was found
+        """
+        result = self.find_best_move(g, timeout)
+        if result is None:
+            return None
+        return result[1]
+
+    def find_best_move(self, g, timeout=None):
+        """
+        Find the move with the best exact score in a game's current position
+        :param g: Game object, whose game is still on
+        :param timeout: A float representing a time limit in seconds
+        :return: A tuple (move, score), or None if the time limit passed (or
+        the search was cancelled) before it was found
+        """
+        self.__prepare(g)
+        self.__nodes = 0
+        self.__timed_out = False
+        self.__cancelled = False
+        if timeout is not None:
+            self.__deadline = time.monotonic() + timeout
+        board = g.get_bitboard_copy().get_board()
+        player = g.get_current_player()
+        current = board.get_disks(player)
+        mask = current | board.get_disks(1 - player)
+        moves = g.get_turn() - 1
+        possible = (mask + self.__bottom_mask) & self.__board_mask
+        wins = possible & self.__winning_cells(current, mask)
+        result = None
+        if wins:
+            result = (self.__column(wins & -wins),
+                      self.__win_score(moves + 1))
+        else:
+            score = self.__solve(current, mask, moves)
+            if not self.__timed_out:
+                result = self.__choose_move(current, mask, moves, score)
+        self.__deadline = None
+        self.__cancelled = False
+        if self.__timed_out:
+            return None
+        return result
+
+    def cancel(self):
+        """
+        Cancel the current search, if any. Searches started after it aren't
+        affected
+        :return: None
+        """
+        self.__cancelled = True
+
+    def get_nodes(self):
+        """
+        :return: The number of positions searched by the last search
+        """
+        return self.__nodes
+
+    def __column(self, move):
+        """
+        :param move: The bit mask of a single cell
+        :return: The column of the cell
+        """
+        return (move.bit_length() - 1) // (self.__variant[0] + 1)
+
+    def __solve(self, current, mask, moves):
+        """
+        Find the exact score of a position where the player to move can't win
+        at once, by narrowing the range of possible scores with null window
+        searches
+        :param current: The bit mask of the disks of the player to move
+        :param mask: The bit mask of all the disks on the board
+        :param moves: The number of moves made so far
+        :return: The score, for the player to move
+        """
+        low = -self.__win_score(moves + 2)
+        high = self.__win_score(moves + 3)
+        while low < high and not self.__timed_out:
+            # guesses are pulled towards 0, since proving a draw or a quick
+            # win is cheaper than proving a distant one
+            guess = low + (high - low) // 2
+            if guess <= 0 and int(low / 2) < guess:
+                guess = int(low / 2)
+            elif guess >= 0 and int(high / 2) > guess:
+                guess = int(high / 2)
+            score = self.__negamax(current, mask, moves, guess, guess + 1)
+            if score <= guess:
+                high = score
+            else:
+                low = score
+        return low
+
+    def __choose_move(self, current, mask, moves, score):
+        """
+        Find a move reaching the score of a position
+        :param current: The bit mask of the disks of the player to move
+        :param mask: The bit mask of all the disks on the board
+        :param moves: The number of moves made so far
+        :param score: The exact score of the position
+        :return: A tuple (move, score)
+        """
+        possible = (mask + self.__bottom_mask) & self.__board_mask
+        candidates = self.__safe_moves(current, mask, possible)
+        if not candidates:
+            # every move loses at once, so any legal move will do
+            candidates = possible
+        for col_mask in self.__col_masks:
+            move = candidates & col_mask
+            if not move:
+                continue
+            # the move reaches the score if the opponent can't do better than
+            # minus the score after it
+            opponent_score = self.__negamax(current ^ mask, mask | move,
+                                            moves + 1, -score, -score + 1)
+            if self.__timed_out:
+                break
+            if opponent_score <= -score:
+                return self.__column(move), score
+        move = candidates & -candidates
+        return self.__column(move), score
+
+    def __safe_moves(self, current, mask, possible):
+        """
+        Find the moves that don't let the opponent win on their next move
+        :param current: The bit mask of the disks of the player to move
+        :param mask: The bit mask of all the disks on the board
+        :param possible: The bit mask of the cells where a move can be made
+        :return: A bit mask with a single cell per safe move
+        """
+        threats = self.__winning_cells(current ^ mask, mask)
+        forced = possible & threats
+        if forced:
+            if forced & (forced - 1):
+                # two threats can't both be blocked
+                return 0
+            possible = forced
+        # playing right under a threat lets the opponent complete it
+        return possible & ~(threats >> 1)
+
+    def __negamax(self, current, mask, moves, low_bound, up_bound):
+        """
+        Score a position where the player to move can't win at once, if the
+        score is between two bounds. If the search deadline passes, the search
+        is abandoned and the returned score is meaningless
+        :param current: The bit mask of the disks of the player to move
+        :param mask: The bit mask of all the disks on the board
+        :param moves: The number of moves made so far
+        :param low_bound: lowest score calculated
+        :param up_bound: highest score calculated
+        :return: The exact score if it's between the bounds, otherwise a
+        bound at or beyond the nearer one
+        """
+        self.__nodes += 1
+        if self.__nodes % Solver.TIMEOUT_CHECK_PERIOD == 0 and (
+                self.__cancelled or (self.__deadline is not None and
+                                     time.monotonic() > self.__deadline)):
+            self.__timed_out = True
+        if self.__timed_out:
+            return Solver.DRAW_SCORE
+        possible = (mask + self.__bottom_mask) & self.__board_mask
+        candidates = self.__safe_moves(current, mask, possible)
+        if not candidates:
+            return -self.__win_score(moves + 2)
+        if moves >= self.__cells - 2:
+            # no one can win with the last two moves left
+            return Solver.DRAW_SCORE
+        # the opponent can't win on their next move any more, and we can't
+        # win on this one
+        low_bound = max(low_bound, -self.__win_score(moves + 4))
+        up_bound = min(up_bound, self.__win_score(moves + 3))
+        key = current + mask
+        entry = self.__table.lookup(key)
+        if entry is not None:
+            _, value, flag, _ = entry
+            if flag == TranspositionTable.LOWER_BOUND:
+                low_bound = max(low_bound, value)
+            else:
+                up_bound = min(up_bound, value)
+        if low_bound >= up_bound:
+            return low_bound
+        # try first the moves creating the most threats of our own
+        ordered = []
+        for col_mask in self.__col_masks:
+            move = candidates & col_mask
+            if move:
+                threats = self.__winning_cells(current | move, mask | move)
+                ordered.append((-bin(threats).count("1"), len(ordered), move))
+        ordered.sort()
+        depth = self.__cells - moves
+        for _, _, move in ordered:
+            score = -self.__negamax(current ^ mask, mask | move, moves + 1,
+                                    -up_bound, -low_bound)
+            if self.__timed_out:
+                return Solver.DRAW_SCORE
+            if score >= up_bound:
+                self.__table.store(key, depth, score,
+                                   TranspositionTable.LOWER_BOUND, None)
+                return score
+            if score > low_bound:
+                low_bound = score
+        self.__table.store(key, depth, low_bound,
+                           TranspositionTable.UPPER_BOUND, None)
+        return low_bound
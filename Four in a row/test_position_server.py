@@ -0,0 +1,33 @@
+from position_server import PositionServer
+import unittest
+
+
+class TestAnswer(unittest.TestCase):
+    """
+    Tests for answering the request messages of a position server
+    """
+
+    TURNS_AHEAD = 2
+
+    def setUp(self):
+        self.server = PositionServer(turns_ahead=TestAnswer.TURNS_AHEAD)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_mixed_batch(self):
+        # a valid position, a malformed one, an empty board, a won game and
+        # an illegal column
+        request = "3,3;3,x;;0,1,0,1,0,1,0;9"
+        expected = self.server.find_moves([[3, 3], []])
+        self.assertEqual(self.server.answer(request).split(";"),
+                         [str(expected[0]), PositionServer.ERROR_REPLY,
+                          str(expected[1]), "", ""])
+
+    def test_malformed_batch(self):
+        self.assertEqual(self.server.answer("a;1.5"),
+                         ";".join([PositionServer.ERROR_REPLY] * 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
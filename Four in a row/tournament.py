@@ -0,0 +1,138 @@
+from game import Game
+from ai import AI
+import multiprocessing
+import random
+import sys
+import time
+
+
+USAGE = "Usage: tournament.py <games> <player1> <player2> [processes]\n" \
+        "A player is either a number of turns ahead to search (e.g. 7) or a " \
+        "time limit per move in seconds (e.g. 0.5s)"
+MIN_ARGUMENTS = 4
+MAX_ARGUMENTS = 5
+GAMES_ARGUMENT = 1
+PLAYER1_ARGUMENT = 2
+PLAYER2_ARGUMENT = 3
+PROCESSES_ARGUMENT = 4
+TIMEOUT_SUFFIX = "s"
+# the ais are deterministic, so every game starts with a few random moves to
+# keep games from repeating. Must be even, so that the player making the
+# first move after the opening is player one
+OPENING_MOVES = 2
+PLAYERS = 2
+DRAW = "draw"
+RESULT_FORMAT = "%s: %d wins, %.3f s per move, %.0f nodes per second"
+
+
+def parse_player(spec):
+    """
+    Parse a player's specification
+    :param spec: A number of turns ahead, or a time limit ending with "s"
+    :return: A tuple (turns_ahead, timeout), one of which is None
+    """
+    if spec.endswith(TIMEOUT_SUFFIX):
+        return None, float(spec[:-len(TIMEOUT_SUFFIX)])
+    return int(spec), None
+
+
+def play_game(task):
+    """
+    Play a single game between two ais, without a gui
+    :param task: A tuple (first, players, seed), where first is the index of
+    the player making the first move, players is a tuple of two
+    (turns_ahead, timeout) specifications and seed seeds the random opening
+    :return: A tuple (winner, times, nodes, moves), where winner is the index
+    of the winning player or DRAW, and times, nodes and moves list for each
+    player the seconds spent, game states searched and moves searched for
+    """
+    first, players, seed = task
+    ais = [AI() for _ in range(PLAYERS)]
+    times = [0.0] * PLAYERS
+    nodes = [0] * PLAYERS
+    moves = [0] * PLAYERS
+    g = Game()
+    opening = random.Random(seed)
+    for _ in range(OPENING_MOVES):
+        g.make_move(opening.choice(list(g.get_legal_moves())))
+    player = first
+    while g.get_winner() is None:
+        turns_ahead, timeout = players[player]
+        found = []
+        start = time.perf_counter()
+        if timeout is None:
+            ais[player].find_legal_move(g, found.append,
+                                        turns_ahead=turns_ahead)
+        else:
+            ais[player].find_legal_move(g, found.append, timeout)
+        times[player] += time.perf_counter() - start
+        nodes[player] += ais[player].get_stats().get_nodes()
+        moves[player] += 1
+        g.make_move(found[-1])
+        player = 1 - player
+    winner = g.get_winner()
+    if winner == Game.DRAW:
+        winner = DRAW
+    elif first == 1:
+        winner = 1 - winner
+    return winner, times, nodes, moves
+
+
+def run_tournament(games, players, processes=None):
+    """
+    Play many games between two ais in parallel processes. Each pair of
+    games starts from the same random opening, and the players take turns
+    making the first move after it
+    :param games: The number of games to play
+    :param players: A tuple of two (turns_ahead, timeout) specifications
+    :param processes: The number of processes to play in, one per cpu if None
+    :return: A dictionary with the number of wins of each player (by index)
+    and of draws, and for each player the average seconds per move and the
+    game states searched per second
+    """
+    tasks = [(index % PLAYERS, players, index // PLAYERS)
+             for index in range(games)]
+    wins = {0: 0, 1: 0, DRAW: 0}
+    times = [0.0] * PLAYERS
+    nodes = [0] * PLAYERS
+    moves = [0] * PLAYERS
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, tasks):
+            winner, game_times, game_nodes, game_moves = result
+            wins[winner] += 1
+            for player in range(PLAYERS):
+                times[player] += game_times[player]
+                nodes[player] += game_nodes[player]
+                moves[player] += game_moves[player]
+    return {"wins": wins,
+            "move_time": [times[player] / max(moves[player], 1)
+                          for player in range(PLAYERS)],
+            "nodes_per_second": [nodes[player] / max(times[player], 1e-9)
+                                 for player in range(PLAYERS)]}
+
+
+def main(argv):
+    """
+    Run a tournament as specified by program arguments, and print results
+    :param argv: A list of arguments
+    :return: None
+    """
+    if not MIN_ARGUMENTS <= len(argv) <= MAX_ARGUMENTS:
+        print(USAGE)
+        return
+    players = (parse_player(argv[PLAYER1_ARGUMENT]),
+               parse_player(argv[PLAYER2_ARGUMENT]))
+    processes = None
+    if len(argv) == MAX_ARGUMENTS:
+        processes = int(argv[PROCESSES_ARGUMENT])
+    results = run_tournament(int(argv[GAMES_ARGUMENT]), players, processes)
+    for player in range(PLAYERS):
+        print(RESULT_FORMAT % (argv[PLAYER1_ARGUMENT + player],
+                               results["wins"][player],
+                               results["move_time"][player],
+                               results["nodes_per_second"][player]))
+    print("draws: %d" % results["wins"][DRAW])
+
+
+if __name__ == '__main__':
+    main(sys.argv)
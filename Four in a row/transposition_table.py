@@ -0,0 +1,106 @@
+class TranspositionTable:
+    """
+    A fixed capacity cache of search results, keyed by Zobrist hashes of
+    game states. Every entry holds the depth a state was searched to, its
+    rating, whether that rating is exact or only a bound (alpha-beta cutoffs
+    leave bounds) and the best move found. Entries are kept in buckets of two
+    slots: the first keeps the deepest search seen for the bucket, and the
+    second always takes the newest entry, so memory use never grows while
+    both deep and recent results survive
+    """
+
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+    DEFAULT_CAPACITY = 2 ** 18
+    SLOTS = 2
+    DEPTH_PREFERRED = 0
+    ALWAYS_REPLACE = 1
+    NO_DEPTH = -1
+    CAPACITY_ERROR = "Table capacity must be at least %d"
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Constructor for transposition table object
+        :param capacity: the maximal number of entries in the table
+        """
+        if capacity < TranspositionTable.SLOTS:
+            raise ValueError(TranspositionTable.CAPACITY_ERROR %
+                             TranspositionTable.SLOTS)
+        self.__buckets = capacity // TranspositionTable.SLOTS
+        size = self.__buckets * TranspositionTable.SLOTS
+        self.__keys = [None] * size
+        self.__depths = [TranspositionTable.NO_DEPTH] * size
+        self.__values = [None] * size
+        self.__flags = [None] * size
+        self.__moves = [None] * size
+        self.__size = 0
+
+    def lookup(self, key):
+        """
+        Find the entry of a game state
+        :param key: The Zobrist hash of the game state
+        :return: A tuple (depth, value, flag, move) if the state is in the
+        table, None otherwise
+        """
+        index = (key % self.__buckets) * TranspositionTable.SLOTS
+        for slot in range(index, index + TranspositionTable.SLOTS):
+            if self.__keys[slot] == key:
+                return (self.__depths[slot], self.__values[slot],
+                        self.__flags[slot], self.__moves[slot])
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        """
+        Store the result of searching a game state
+        :param key: The Zobrist hash of the game state
+        :param depth: The number of turns ahead the state was searched
+        :param value: The rating found for the state
+        :param flag: EXACT, LOWER_BOUND or UPPER_BOUND
+        :param move: The best move found from the state
+        :return: None
+        """
+        index = (key % self.__buckets) * TranspositionTable.SLOTS
+        preferred = index + TranspositionTable.DEPTH_PREFERRED
+        newest = index + TranspositionTable.ALWAYS_REPLACE
+        if self.__keys[preferred] == key or \
+                depth >= self.__depths[preferred]:
+            slot = preferred
+            # don't keep a stale copy of the state in the other slot
+            if self.__keys[newest] == key:
+                self.__keys[newest] = None
+                self.__size -= 1
+        else:
+            slot = newest
+        if self.__keys[slot] is None:
+            self.__size += 1
+        self.__keys[slot] = key
+        self.__depths[slot] = depth
+        self.__values[slot] = value
+        self.__flags[slot] = flag
+        self.__moves[slot] = move
+
+    def clear(self):
+        """
+        Remove all entries from the table
+        :return: None
+        """
+        size = len(self.__keys)
+        self.__keys = [None] * size
+        self.__depths = [TranspositionTable.NO_DEPTH] * size
+        self.__values = [None] * size
+        self.__flags = [None] * size
+        self.__moves = [None] * size
+        self.__size = 0
+
+    def get_capacity(self):
+        """
+        :return: The maximal number of entries in the table
+        """
+        return len(self.__keys)
+
+    def __len__(self):
+        """
+        :return: The number of entries in the table
+        """
+        return self.__size
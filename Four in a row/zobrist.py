@@ -0,0 +1,34 @@
+import random
+
+
+class Zobrist:
+    """
+    A class providing Zobrist hashing keys for boards of four in a row. Every
+    (player, cell) pair is given a random 64 bit key, and a board's hash is
+    the xor of the keys of all disks on it, so adding or removing a disk
+    updates the hash with a single xor
+    """
+
+    KEY_BITS = 64
+    PLAYERS = 2
+    SEED = 4
+    # keys are generated once per board size and shared by all boards
+    __keys = {}
+
+    @staticmethod
+    def get_keys(height, width):
+        """
+        Get the Zobrist keys for a board of a given size. The keys are
+        generated from a fixed seed, so they are the same in every process
+        :param height: the height of the board
+        :param width: the width of the board
+        :return: A list with a list of keys per player, indexed by
+        row * width + col
+        """
+        if (height, width) not in Zobrist.__keys:
+            generator = random.Random(Zobrist.SEED)
+            Zobrist.__keys[height, width] = [
+                [generator.getrandbits(Zobrist.KEY_BITS)
+                 for _ in range(height * width)]
+                for _ in range(Zobrist.PLAYERS)]
+        return Zobrist.__keys[height, width]
@@ -0,0 +1,238 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy
+import sol3
+
+SIZES = (256, 512, 1024, 2048, 4096, 8192)
+LEVELS = (3, 5, 7)
+FILTER_SIZES = (3, 5, 9)
+REPEATS = 3
+SEED = 0
+MEGA = 10 ** 6
+# a result is a regression when it is slower than its baseline by more than this factor
+REGRESSION_THRESHOLD = 1.1
+GAUSSIAN = 'gaussian'
+LAPLACIAN = 'laplacian'
+RECONSTRUCT = 'reconstruct'
+BLEND = 'blend'
+OPERATIONS = (GAUSSIAN, LAPLACIAN, RECONSTRUCT, BLEND)
+# the fields identifying a benchmark, matched when comparing runs
+KEY_FIELDS = ('operation', 'size', 'channels', 'max_levels', 'filter_size', 'backend', 'dtype')
+
+def synthetic_image(size, channels, dtype, seed=SEED):
+    """
+    creates a smooth synthetic image with fine detail, so every level of its pyramids holds content
+    :param size: the number of rows and columns of the image
+    :param channels: the number of channels, 1 for a grayscale image of shape (size, size)
+    :param dtype: the floating point type of the image
+    :param seed: the seed of the random noise added to the image
+    :return: an image with values in [0, 1]
+    """
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 1, size, dtype=dtype)
+    im = np.add.outer(ramp, ramp) / 2
+    if channels > 1:
+        im = np.repeat(im[..., np.newaxis], channels, axis=2)
+    im += rng.random(im.shape, dtype=np.float64).astype(dtype) * 0.1
+    return np.clip(im, 0, 1)
+
+def half_mask(size):
+    """
+    creates a mask selecting the left half of an image
+    :param size: the number of rows and columns of the mask
+    :return: a boolean mask of shape (size, size)
+    """
+    mask = np.zeros((size, size), dtype=bool)
+    mask[:, :size // 2] = True
+    return mask
+
+def make_task(operation, size, channels, max_levels, filter_size, backend, dtype):
+    """
+    prepares the inputs of a benchmarked operation, so only the operation itself is measured
+    :param operation: one of OPERATIONS
+    :param size: the number of rows and columns of the images
+    :param channels: the number of channels of the images
+    :param max_levels: the max_levels parameter of the pyramids
+    :param filter_size: the size of the Gaussian filter of the pyramids
+    :param backend: CONVOLVE or POLYPHASE
+    :param dtype: the floating point type of the images
+    :return: a function running the operation once
+    """
+    im = synthetic_image(size, channels, dtype)
+    if operation == GAUSSIAN:
+        return lambda: sol3.build_gaussian_pyramid(im, max_levels, filter_size, backend)
+    if operation == LAPLACIAN:
+        return lambda: sol3.build_laplacian_pyramid(im, max_levels, filter_size, backend)
+    if operation == RECONSTRUCT:
+        lpyr, filter_vec = sol3.build_laplacian_pyramid(im, max_levels, filter_size, backend)
+        coeff = [1 for _ in lpyr]
+        return lambda: sol3.laplacian_to_image(lpyr, filter_vec, coeff, backend)
+    im2 = synthetic_image(size, channels, dtype, SEED + 1)[::-1].copy()
+    mask = half_mask(size)
+    return lambda: sol3.pyramid_blending(im, im2, mask, max_levels, filter_size, filter_size,
+                                         backend)
+
+def measure(task, repeats):
+    """
+    measures the running time and the peak memory of a task. The time is the best of several
+    runs, and the memory is traced in a separate run, since tracing slows allocations down
+    :param task: a function to measure
+    :param repeats: the number of timed runs
+    :return: a tuple of the time in seconds and the peak memory in bytes
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        task()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        task()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def run_benchmarks(operations=OPERATIONS, sizes=SIZES, levels=LEVELS, filter_sizes=FILTER_SIZES,
+                   channels=1, backend=sol3.POLYPHASE, dtype=np.float64, repeats=REPEATS,
+                   report=print):
+    """
+    benchmarks every combination of operations, image sizes, levels and filter sizes
+    :param operations: the operations to benchmark, of OPERATIONS
+    :param sizes: the numbers of rows and columns of the benchmarked images
+    :param levels: the max_levels values to build pyramids with
+    :param filter_sizes: the Gaussian filter sizes to build pyramids with
+    :param channels: the number of channels of the images
+    :param backend: CONVOLVE or POLYPHASE
+    :param dtype: the floating point type of the images
+    :param repeats: the number of timed runs of each benchmark
+    :param report: a function called with a line describing each result as it is found, None to
+    stay silent
+    :return: a list of results, each a dict of the KEY_FIELDS and the time in seconds, the peak
+    memory in bytes and the throughput in megapixels per second
+    """
+    results = []
+    for operation in operations:
+        for size in sizes:
+            for max_levels in levels:
+                for filter_size in filter_sizes:
+                    task = make_task(operation, size, channels, max_levels, filter_size, backend,
+                                     dtype)
+                    seconds, peak = measure(task, repeats)
+                    result = {'operation': operation, 'size': size, 'channels': channels,
+                              'max_levels': max_levels, 'filter_size': filter_size,
+                              'backend': backend, 'dtype': np.dtype(dtype).name,
+                              'seconds': seconds, 'peak_bytes': peak,
+                              'mpixels_per_second': size * size / MEGA / seconds}
+                    results.append(result)
+                    if report is not None:
+                        report(format_result(result))
+    return results
+
+def format_result(result):
+    """
+    describes a result in a single line
+    :param result: a result, as returned by run_benchmarks
+    :return: the description
+    """
+    return '%-11s %5d^2 x%d levels=%d filter=%-2d %-9s %-7s %9.4fs %9.1fMB %9.1fMP/s' % (
+        result['operation'], result['size'], result['channels'], result['max_levels'],
+        result['filter_size'], result['backend'], result['dtype'], result['seconds'],
+        result['peak_bytes'] / MEGA, result['mpixels_per_second'])
+
+def environment():
+    """
+    describes the environment benchmarks run in, so results of different machines or library
+    versions aren't mistaken for regressions
+    :return: a dict of the python, numpy and scipy versions and the machine
+    """
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__, 'machine': platform.machine(),
+            'processor': platform.processor()}
+
+def save_results(filename, results):
+    """
+    saves results as JSON, together with the environment they were found in
+    :param filename: the filename of the JSON file
+    :param results: results, as returned by run_benchmarks
+    :return: None
+    """
+    with open(filename, 'w') as results_file:
+        json.dump({'environment': environment(), 'results': results}, results_file, indent=2)
+
+def load_results(filename):
+    """
+    loads results saved by save_results
+    :param filename: the filename of the JSON file
+    :return: the list of results
+    """
+    with open(filename) as results_file:
+        return json.load(results_file)['results']
+
+def compare_results(baseline, results, threshold=REGRESSION_THRESHOLD, match_backend=True):
+    """
+    compares results with those of a baseline run
+    :param baseline: the results of the baseline run
+    :param results: the results to compare
+    :param threshold: the factor by which a result must be slower than its baseline to be
+    reported as a regression
+    :param match_backend: False to compare results of one backend with those of another (e.g. to
+    compare CONVOLVE with POLYPHASE), True to only compare results of the same backend
+    :return: a list of (result, baseline result, speedup, is regression) tuples, of the results
+    which have a baseline
+    """
+    fields = [field for field in KEY_FIELDS if match_backend or field != 'backend']
+    by_key = {tuple(result[field] for field in fields): result for result in baseline}
+    comparisons = []
+    for result in results:
+        base = by_key.get(tuple(result[field] for field in fields))
+        if base is None:
+            continue
+        speedup = base['seconds'] / result['seconds']
+        comparisons.append((result, base, speedup, speedup * threshold < 1))
+    return comparisons
+
+def main():
+    """
+    runs the benchmarks given on the command line
+    :return: the number of regressions found, 0 if the results weren't compared
+    """
+    parser = argparse.ArgumentParser(description='benchmarks the pyramids of sol3')
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--levels', nargs='+', type=int, default=LEVELS)
+    parser.add_argument('--filter-sizes', nargs='+', type=int, default=FILTER_SIZES)
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--backend', choices=(sol3.CONVOLVE, sol3.POLYPHASE),
+                        default=sol3.POLYPHASE)
+    parser.add_argument('--float32', action='store_true', help='benchmark single precision')
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--output', help='a JSON file to save the results to')
+    parser.add_argument('--compare', help='a JSON file of baseline results to compare with')
+    parser.add_argument('--any-backend', action='store_true',
+                        help='compare with baseline results of another backend too')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+    dtype = np.float32 if args.float32 else np.float64
+    results = run_benchmarks(args.operations, args.sizes, args.levels, args.filter_sizes,
+                             args.channels, args.backend, dtype, args.repeats)
+    if args.output:
+        save_results(args.output, results)
+    if not args.compare:
+        return 0
+    regressions = 0
+    for result, base, speedup, regression in compare_results(
+            load_results(args.compare), results, args.threshold, not args.any_backend):
+        regressions += regression
+        print('%s  baseline %9.4fs  x%.2f%s' % (format_result(result), base['seconds'], speedup,
+                                                 '  REGRESSION' if regression else ''))
+    return regressions
+
+if __name__ == '__main__':
+    # a nonzero exit status tells scripts comparing runs that something regressed
+    sys.exit(1 if main() else 0)
@@ -1,14 +1,38 @@
 import numpy as np
-from scipy.misc import imread
-from scipy.ndimage.filters import convolve
+try:
+    from scipy.misc import imread
+except ImportError:
+    # scipy.misc.imread was removed from scipy 1.2
+    from imageio import imread
+from scipy.ndimage import convolve1d
 from scipy.signal import convolve2d
 from skimage.color import rgb2gray
 import matplotlib.pyplot as plt
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
+import threading
 
 GRAYSCALE = 1
 RGB = 2
 COLOR_RANGE = 256
+# backends for reducing and expanding images: CONVOLVE convolves the full size image and then
+# subsamples it (or zero-stuffs it first, when expanding), while POLYPHASE only computes the
+# samples that are kept and only multiplies by the filter taps that meet nonzero samples
+CONVOLVE = 'convolve'
+POLYPHASE = 'polyphase'
+# images may be a single channel (H, W), multichannel (H, W, C) or a batch (N, H, W, C)
+BATCH_DIMS = 4
+MIN_LEVEL_SIZE = 16
+DEFAULT_TILE_SIZE = 1024
+# the smallest tile of tiled blending, in halos. Each tile is blended in a window a halo wider on
+# every side, so smaller tiles would spend most of their time blending halos
+MIN_TILE_HALOS = 2
+DEFAULT_CACHE_BYTES = 1 << 30
+GAUSSIAN = 'gaussian'
+LAPLACIAN = 'laplacian'
+DEFAULT_FPS = 30
 
 def relpath(filename):
     """
@@ -18,43 +42,286 @@ def relpath(filename):
     """
     return os.path.join(os.path.dirname(__file__), filename)
 
-def read_image(filename, representation):
+def read_image(filename, representation, dtype=np.float64):
     """
     opens an image either in rgb or grayscale representation, depending on input
     :param filename: the filename of an image on disk (could be grayscale or RGB).
     :param representation: representation code, either 1 or 2 defining whether the output should be a grayscale
     image (1) or an RGB image (2)
-    :return: the image in np.float64 format
+    :param dtype: the floating point type of the output, np.float32 halves the memory taken by the
+    image and by the pyramids built from it
+    :return: the image in the given format
     """
-    image = imread(filename)
-    image = image.astype(np.float64).copy() / (COLOR_RANGE - 1)
+    return to_float_image(imread(filename), representation, dtype)
+
+def to_float_image(image, representation, dtype=np.float64):
+    """
+    converts an image of 8 bit colors to floating point values in [0, 1]
+    :param image: an image of integer values in [0, 255], grayscale or RGB
+    :param representation: representation code, either 1 or 2 defining whether the output should be
+    a grayscale image (1) or an RGB image (2)
+    :param dtype: the floating point type of the output
+    :return: the image in the given format
+    """
+    image = image.astype(dtype) / (COLOR_RANGE - 1)
     if representation == GRAYSCALE:
-        image = rgb2gray(image)
+        image = rgb2gray(image).astype(dtype, copy=False)
     return image
 
-def reduce_im(im, filter_vec):
+def read_frames(filename, representation, dtype=np.float64):
+    """
+    reads the frames of a video one at a time, so only a single frame is held in memory at once.
+    Videos are read with imageio, which is only imported when a video is read
+    :param filename: the filename of a video on disk
+    :param representation: representation code, either 1 or 2 defining whether the frames should
+    be grayscale images (1) or RGB images (2)
+    :param dtype: the floating point type of the frames
+    :return: a generator of the frames, in the format read_image returns
+    """
+    import imageio
+    with imageio.get_reader(filename) as reader:
+        for frame in reader:
+            frame = np.asarray(frame)
+            if frame.ndim == 3:
+                # drop the alpha channel of RGBA frames
+                frame = frame[..., :3]
+            yield to_float_image(frame, representation, dtype)
+
+def read_fps(filename):
+    """
+    finds the frame rate of a video
+    :param filename: the filename of a video on disk
+    :return: the number of frames per second, DEFAULT_FPS if the video doesn't tell
+    """
+    import imageio
+    with imageio.get_reader(filename) as reader:
+        return reader.get_meta_data().get('fps', DEFAULT_FPS)
+
+def write_frames(filename, frames, fps=DEFAULT_FPS):
+    """
+    writes frames to a video as they are generated, so only a single frame is held in memory at
+    once. Videos are written with imageio, which is only imported when a video is written
+    :param filename: the filename of the video to write
+    :param frames: an iterable of images with values in [0, 1], all of the same shape
+    :param fps: the number of frames per second of the video
+    :return: the number of frames written
+    """
+    import imageio
+    count = 0
+    with imageio.get_writer(filename, fps=fps) as writer:
+        for frame in frames:
+            frame = np.round(np.clip(frame, 0, 1) * (COLOR_RANGE - 1)).astype(np.uint8)
+            writer.append_data(frame)
+            count += 1
+    return count
+
+def float_dtype(im):
+    """
+    finds the type pyramids of an image are computed in, the image's own floating point type
+    (so np.float32 images are processed in single precision), or np.float64 for other images
+    :param im: an image
+    :return: a numpy dtype
+    """
+    if np.issubdtype(im.dtype, np.floating):
+        return im.dtype
+    return np.dtype(np.float64)
+
+def axis_slice(ndim, axis, index):
+    """
+    creates an index selecting along a single axis of an array
+    :param ndim: the number of dimensions of the array
+    :param axis: the axis to select along
+    :param index: a slice (or integer) to select with along the axis
+    :return: a tuple to index the array with
+    """
+    indices = [slice(None)] * ndim
+    indices[axis] = index
+    return tuple(indices)
+
+def spatial_axes(im):
+    """
+    finds the axes of the rows and columns of an image
+    :param im: an image of shape (H, W) or (H, W, C), or a batch of images of shape (N, H, W, C)
+    :return: a tuple of the row axis and the column axis
+    """
+    if im.ndim == BATCH_DIMS:
+        return 1, 2
+    return 0, 1
+
+def reduce_axis(im, filter_vec, axis):
+    """
+    blurs an image along a single axis and keeps every second sample, computing only the kept
+    samples
+    :param im: an image
+    :param filter_vec: row vector to convolve the image with
+    :param axis: the axis to reduce
+    :return: the image reduced along the axis
+    """
+    taps = filter_vec.ravel()[::-1].astype(float_dtype(im))
+    radius = (len(taps) - 1) // 2
+    length = (im.shape[axis] + 1) // 2
+    padding = [(0, 0)] * im.ndim
+    padding[axis] = (radius, radius)
+    padded = np.pad(im, padding, mode='reflect')
+    res = taps[0] * padded[axis_slice(im.ndim, axis, slice(0, 2 * length - 1, 2))]
+    for i in range(1, len(taps)):
+        res += taps[i] * padded[axis_slice(im.ndim, axis, slice(i, i + 2 * length - 1, 2))]
+    return res
+
+def expand_padding(filter_vec):
+    """
+    finds the padding of an image expanded by expand_axis
+    :param filter_vec: row vector the image is convolved with
+    :return: a tuple of the number of samples added before the image and after it
+    """
+    radius = (filter_vec.size - 1) // 2
+    return radius // 2, (radius + 1) // 2
+
+def pad_axis(im, axis, left, right, out):
+    """
+    pads an image along a single axis into a given array, reflecting it around its first sample
+    on the left and repeating it symmetrically on the right, as numpy.pad's 'reflect' and
+    'symmetric' modes would, but without allocating the padded image
+    :param im: an image, longer than left along the axis
+    :param axis: the axis to pad
+    :param left: the number of samples to add before the image
+    :param right: the number of samples to add after it
+    :param out: an array of the padded image's shape to write it to
+    :return: out
+    """
+    length = im.shape[axis]
+    out[axis_slice(im.ndim, axis, slice(left, left + length))] = im
+    for i in range(1, left + 1):
+        out[axis_slice(im.ndim, axis, left - i)] = im[axis_slice(im.ndim, axis, i)]
+    end = left + length
+    for i in range(right):
+        out[axis_slice(im.ndim, axis, end + i)] = out[axis_slice(im.ndim, axis, end - 1 - i)]
+    return out
+
+def expand_axis(im, filter_vec, axis, out=None, padded=None, scratch=None):
+    """
+    doubles the size of an image along a single axis, as blurring it after placing a zero after
+    every sample would, but multiplying only by the filter taps that meet the original samples
+    :param im: an image
+    :param filter_vec: row vector to convolve the image with
+    :param axis: the axis to expand
+    :param out: an array to write the expanded image to, allocated if None
+    :param padded: an array to pad the image into, of its shape lengthened along the axis by
+    expand_padding, allocated if None
+    :param scratch: an array of the image's shape and type to multiply it by taps in, allocated
+    if None
+    :return: the image expanded along the axis
+    """
+    dtype = float_dtype(im)
+    taps = filter_vec.ravel()[::-1].astype(dtype)
+    radius = (len(taps) - 1) // 2
+    length = im.shape[axis]
+    # the zero-stuffed image is mirrored around its first and last samples. Its first sample is
+    # an original one and its last is a zero, so the original samples are reflected on the left
+    # and repeated symmetrically on the right
+    left, right = expand_padding(filter_vec)
+    if padded is None:
+        shape = list(im.shape)
+        shape[axis] += left + right
+        padded = np.empty(shape, dtype=im.dtype)
+    pad_axis(im, axis, left, right, padded)
+    if scratch is None:
+        scratch = np.empty(im.shape, dtype=dtype)
+    if out is None:
+        shape = list(im.shape)
+        shape[axis] = 2 * length
+        out = np.empty(shape, dtype=dtype)
+    out.fill(0)
+    for phase in range(2):
+        # output sample 2 * j + phase meets original sample j + shift through tap
+        # radius + 2 * shift - phase
+        res = out[axis_slice(im.ndim, axis, slice(phase, None, 2))]
+        for shift in range(-left, right + 1):
+            tap = radius + 2 * shift - phase
+            if 0 <= tap < len(taps):
+                start = left + shift
+                np.multiply(taps[tap], padded[axis_slice(im.ndim, axis,
+                                                         slice(start, start + length))],
+                            out=scratch)
+                np.add(res, scratch, out=res)
+    return out
+
+def reduce_im(im, filter_vec, backend=POLYPHASE):
     """
     reduces the size of an image by half
-    :param im: a grayscale image with double values in [0, 1]
+    :param im: an image with double values in [0, 1], of shape (H, W) or (H, W, C), or a batch of
+    images of shape (N, H, W, C). All channels and images are reduced at once
     :param filter_vec: row vector to convolve the image with
+    :param backend: CONVOLVE or POLYPHASE
     :return: the reduced image
     """
-    im = convolve(im, filter_vec, mode='mirror')
-    im = convolve(im, filter_vec.T, mode='mirror')
-    return im[::2, ::2]
+    rows, cols = spatial_axes(im)
+    if backend == POLYPHASE:
+        return reduce_axis(reduce_axis(im, filter_vec, cols), filter_vec, rows)
+    im = convolve1d(im, filter_vec.ravel(), axis=cols, mode='mirror')
+    im = convolve1d(im, filter_vec.ravel(), axis=rows, mode='mirror')
+    return im[axis_slice(im.ndim, rows, slice(None, None, 2))][
+        axis_slice(im.ndim, cols, slice(None, None, 2))]
 
-def expand_im(im, filter_vec):
+def allocate_expand_work(im, filter_vec, backend=POLYPHASE):
+    """
+    allocates the intermediate arrays of expanding an image, which may be reused for any image of
+    the same shape and type
+    :param im: an image, as taken by expand_im
+    :param filter_vec: row vector the image is convolved with
+    :param backend: CONVOLVE or POLYPHASE
+    :return: a tuple of arrays, the last of which has the expanded image's shape and type
+    """
+    rows, cols = spatial_axes(im)
+    dtype = float_dtype(im)
+    padding = sum(expand_padding(filter_vec))
+    shape = list(im.shape)
+    if backend == POLYPHASE:
+        # the image padded along its rows and the taps' products with it, the image expanded
+        # along its rows, and the same again along its columns. The last products take only
+        # half of their array's columns, which is given the expanded image's shape
+        padded_rows = list(shape)
+        padded_rows[rows] += padding
+        shape[rows] *= 2
+        padded_cols = list(shape)
+        padded_cols[cols] += padding
+        expanded = np.empty(shape, dtype=dtype)
+        shape[cols] *= 2
+        return (np.empty(padded_rows, dtype=dtype), np.empty(im.shape, dtype=dtype), expanded,
+                np.empty(padded_cols, dtype=dtype), np.empty(shape, dtype=dtype))
+    # the zero-stuffed image and the image blurred along its columns
+    shape[rows] *= 2
+    shape[cols] *= 2
+    return np.empty(shape, dtype=dtype), np.empty(shape, dtype=dtype)
+
+def expand_im(im, filter_vec, backend=POLYPHASE, out=None, work=None):
     """
     expands the size of an image by 2
-    :param im: a grayscale image with double values in [0, 1]
+    :param im: an image with double values in [0, 1], of shape (H, W) or (H, W, C), or a batch of
+    images of shape (N, H, W, C). All channels and images are expanded at once
     :param filter_vec: row vector to convolve the image with
+    :param backend: CONVOLVE or POLYPHASE
+    :param out: an array to write the expanded image to, allocated if None
+    :param work: intermediate arrays as allocated by allocate_expand_work, so repeated expansions
+    don't allocate them again. Allocated if None
     :return: the expanded image
     """
-    expansion = np.zeros((2 * im.shape[0], 2 * im.shape[1]))
-    expansion[::2, ::2] = im
-    expansion = convolve(expansion, filter_vec, mode='mirror')
-    expansion = convolve(expansion, filter_vec.T, mode='mirror')
-    return expansion
+    rows, cols = spatial_axes(im)
+    if backend == POLYPHASE:
+        if work is None:
+            return expand_axis(expand_axis(im, filter_vec, rows), filter_vec, cols, out)
+        padded_rows, scratch_rows, expanded, padded_cols, scratch_cols = work
+        expand_axis(im, filter_vec, rows, expanded, padded_rows, scratch_rows)
+        scratch_cols = scratch_cols[axis_slice(im.ndim, cols, slice(0, im.shape[cols]))]
+        return expand_axis(expanded, filter_vec, cols, out, padded_cols, scratch_cols)
+    if work is None:
+        work = allocate_expand_work(im, filter_vec, backend)
+    expansion, blurred = work
+    expansion.fill(0)
+    expansion[axis_slice(im.ndim, rows, slice(None, None, 2))][
+        axis_slice(im.ndim, cols, slice(None, None, 2))] = im
+    convolve1d(expansion, filter_vec.ravel(), axis=cols, output=blurred, mode='mirror')
+    return convolve1d(blurred, filter_vec.ravel(), axis=rows, output=out, mode='mirror')
 
 def generate_gaussian(size):
     """
@@ -70,56 +337,217 @@ def generate_gaussian(size):
         gaussian = convolve2d(gaussian, base)
     return gaussian
 
-def build_gaussian_pyramid(im, max_levels, filter_size):
+class PyramidCache:
+    """
+    a cache of built pyramids, keyed by a hash of the image's content and the parameters the
+    pyramid was built with, so pyramids of the same image are found even when it is read or
+    computed again. When the cached pyramids take more than the cache's memory bound, the least
+    recently used are evicted. Cached levels are made read only, since they are shared by every
+    caller finding them. A cache may be shared by threads building pyramids concurrently
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        """
+        creates an empty cache
+        :param max_bytes: the maximal number of bytes taken by the levels of the cached pyramids
+        """
+        self.__max_bytes = max_bytes
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind, im, max_levels, filter_size, backend):
+        """
+        creates the key of a pyramid
+        :param kind: GAUSSIAN or LAPLACIAN
+        :param im: the image the pyramid is built from
+        :param max_levels: the maximal number of levels in the pyramid
+        :param filter_size: the size of the Gaussian filter the pyramid is built with
+        :param backend: CONVOLVE or POLYPHASE
+        :return: a hashable key
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(im), digest_size=16).digest()
+        return kind, digest, im.shape, im.dtype.str, max_levels, filter_size, backend
+
+    def get(self, key, im):
+        """
+        finds a cached pyramid
+        :param key: the pyramid's key, as made by make_key
+        :param im: the image the pyramid is built from
+        :return: a tuple of the pyramid and the filter used, or None if it isn't cached
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+            self.__entries.move_to_end(key)
+        pyr, filter_vec, _ = entry
+        # levels which are the image itself aren't kept by the cache
+        return [im if level is None else level for level in pyr], filter_vec.copy()
+
+    def put(self, key, im, pyr, filter_vec):
+        """
+        caches a pyramid, evicting the least recently used pyramids if needed
+        :param key: the pyramid's key, as made by make_key
+        :param im: the image the pyramid is built from
+        :param pyr: the pyramid
+        :param filter_vec: the filter used
+        :return: None
+        """
+        levels = [None if level is im else level for level in pyr]
+        size = sum(level.nbytes for level in levels if level is not None)
+        if size > self.__max_bytes:
+            return
+        with self.__lock:
+            if key in self.__entries:
+                return
+            for level in levels:
+                if level is not None:
+                    level.flags.writeable = False
+            self.__entries[key] = (levels, filter_vec.copy(), size)
+            self.__bytes += size
+            while self.__bytes > self.__max_bytes:
+                self.__bytes -= self.__entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        """
+        removes all pyramids from the cache
+        :return: None
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    def get_bytes(self):
+        """
+        :return: the number of bytes taken by the levels of the cached pyramids
+        """
+        return self.__bytes
+
+    def get_hits(self):
+        """
+        :return: the number of pyramids found in the cache
+        """
+        return self.__hits
+
+    def get_misses(self):
+        """
+        :return: the number of pyramids looked for and not found in the cache
+        """
+        return self.__misses
+
+    def __len__(self):
+        """
+        :return: the number of cached pyramids
+        """
+        return len(self.__entries)
+
+def build_gaussian_pyramid(im, max_levels, filter_size, backend=POLYPHASE, cache=None):
     """
     creates a gaussian pyramid for an image
-    :param im: a grayscale image with double values in [0, 1]
+    :param im: an image with double values in [0, 1], of shape (H, W) or (H, W, C), or a batch of
+    images of shape (N, H, W, C)
     :param max_levels: the maximal number of levels in the resulting pyramid.
     :param filter_size: the size of the Gaussian filter (an odd scalar that represents a squared
     filter) to be used in constructing the pyramid filter
+    :param backend: CONVOLVE or POLYPHASE, the way levels are reduced and expanded
+    :param cache: a PyramidCache to look the pyramid up in and add it to, None to always build it
     :return: a tuple of the resulting pyramid and the filter used
     """
+    if cache is not None:
+        key = PyramidCache.make_key(GAUSSIAN, im, max_levels, filter_size, backend)
+        cached = cache.get(key, im)
+        if cached is not None:
+            return cached
     filter_vec = generate_gaussian(filter_size)
+    rows, cols = spatial_axes(im)
     pyr = [im]
     for i in range(1, max_levels):
-        nxt = reduce_im(pyr[i - 1], filter_vec)
-        if nxt.shape[0] < 16 or nxt.shape[1] < 16:
+        nxt = reduce_im(pyr[i - 1], filter_vec, backend)
+        if nxt.shape[rows] < MIN_LEVEL_SIZE or nxt.shape[cols] < MIN_LEVEL_SIZE:
             break
         pyr.append(nxt)
+    if cache is not None:
+        cache.put(key, im, pyr, filter_vec)
     return pyr, filter_vec
 
-def build_laplacian_pyramid(im, max_levels, filter_size):
+def build_laplacian_pyramid(im, max_levels, filter_size, backend=POLYPHASE, cache=None):
     """
     creates a laplacian pyramid for an image
-    :param im: a grayscale image with double values in [0, 1]
+    :param im: an image with double values in [0, 1], of shape (H, W) or (H, W, C), or a batch of
+    images of shape (N, H, W, C)
     :param max_levels: the maximal number of levels in the resulting pyramid.
     :param filter_size: the size of the Gaussian filter (an odd scalar that represents a squared
     filter) to be used in constructing the pyramid filter
+    :param backend: CONVOLVE or POLYPHASE, the way levels are reduced and expanded
+    :param cache: a PyramidCache to look the pyramid up in and add it to, None to always build it
     :return: a tuple of the resulting pyramid and the filter used
     """
-    gaus_pyr, filter_vec = build_gaussian_pyramid(im, max_levels, filter_size)
+    if cache is not None:
+        key = PyramidCache.make_key(LAPLACIAN, im, max_levels, filter_size, backend)
+        cached = cache.get(key, im)
+        if cached is not None:
+            return cached
+    gaus_pyr, filter_vec = build_gaussian_pyramid(im, max_levels, filter_size, backend)
     filter_vec *= 2
     pyr = []
     for i in range(len(gaus_pyr) - 1):
-        cur_lap = gaus_pyr[i] - expand_im(gaus_pyr[i + 1], filter_vec)
+        cur_lap = gaus_pyr[i] - expand_im(gaus_pyr[i + 1], filter_vec, backend)
         pyr.append(cur_lap)
     pyr.append(gaus_pyr[-1])
+    if cache is not None:
+        cache.put(key, im, pyr, filter_vec)
     return pyr, filter_vec
 
-def laplacian_to_image(lpyr, filter_vec, coeff):
+def allocate_buffers(lpyr, filter_vec, backend=POLYPHASE):
+    """
+    allocates buffers for reconstructing images from laplacian pyramids, which may be reused for
+    any pyramid of the same shapes and type, built with the same filter size and backend
+    :param lpyr: a laplacian pyramid
+    :param filter_vec: the filter used to create the pyramid
+    :param backend: CONVOLVE or POLYPHASE, the way levels are expanded
+    :return: a list holding for each level of the pyramid a tuple of an array of its shape and
+    type, and the intermediate arrays of expanding the level above into it, as allocated by
+    allocate_expand_work (None for the top level)
+    """
+    buffers = [(np.empty(level.shape, dtype=float_dtype(level)), None) for level in lpyr]
+    for i in range(len(lpyr) - 1):
+        buffers[i] = buffers[i][0], allocate_expand_work(buffers[i + 1][0], filter_vec, backend)
+    return buffers
+
+def laplacian_to_image(lpyr, filter_vec, coeff, backend=POLYPHASE, buffers=None):
     """
-    reconstructs an image from its laplacian pyramid
+    reconstructs an image from its laplacian pyramid. The pyramid is left unchanged, and every
+    level is reconstructed into its own buffer
     :param lpyr: the laplacian pyramid
     :param filter_vec: the filter used to create the pyramid
     :param coeff: a list of coefficients to multiply levels of the pyramid by
-    :return: the reconstructed image
-    """
-    pyr_depth = len(lpyr)
-    for i in range(pyr_depth):
-        lpyr[i] *= coeff[i]
-    for i in range(pyr_depth - 1):
-        lpyr[pyr_depth - i - 2] += expand_im(lpyr[pyr_depth - i - 1], filter_vec)
-    return lpyr[0]
+    :param backend: CONVOLVE or POLYPHASE, the way levels are expanded
+    :param buffers: buffers to reconstruct the levels into, as allocated by allocate_buffers, so
+    repeated reconstructions don't allocate any array. Allocated if None
+    :return: the reconstructed image, which is the first level's buffer
+    """
+    if buffers is None:
+        # the intermediate arrays of each expansion are allocated by it, and freed once it's done
+        buffers = [(np.empty(level.shape, dtype=float_dtype(level)), None) for level in lpyr]
+    top = len(lpyr) - 1
+    np.multiply(lpyr[top], coeff[top], out=buffers[top][0])
+    for i in range(top - 1, -1, -1):
+        level, work = buffers[i]
+        expand_im(buffers[i + 1][0], filter_vec, backend, level, work)
+        if coeff[i] == 1:
+            np.add(level, lpyr[i], out=level)
+        else:
+            # the last intermediate array of the expansion has the level's shape, and is free
+            # once the level is expanded
+            scratch = None if work is None else work[-1]
+            np.add(level, np.multiply(lpyr[i], coeff[i], out=scratch), out=level)
+    return buffers[0][0]
 
 def stretch_im(im):
     """
@@ -163,13 +591,47 @@ def display_pyramid(pyr, levels):
     plt.imshow(im, cmap=plt.get_cmap('gray'))
     plt.show()
 
-def pyramid_blending(im1, im2, mask, max_levels, filter_size_im, filter_size_mask):
+def blend_level(lap1, lap2, mask_level):
     """
-    performs pyramid blending on two images
-    :param im1: the first input image
-    :param im2: the second input image
+    blends a single level of two laplacian pyramids
+    :param lap1: the level of the first image's pyramid
+    :param lap2: the level of the second image's pyramid
+    :param mask_level: the level of the mask's gaussian pyramid
+    :return: the blended level
+    """
+    return (mask_level * lap1) + ((1 - mask_level) * lap2)
+
+def build_mask_pyramid(mask, im, max_levels, filter_size_mask, backend=POLYPHASE, cache=None):
+    """
+    creates the gaussian pyramid of a blending mask, in the floating point type of the images it
+    blends and shaped to broadcast over their channels
+    :param mask: a boolean mask, as taken by pyramid_blending
+    :param im: an image the mask blends, or any image of the same number of dimensions and type
+    :param max_levels: the maximal number of levels in the resulting pyramid
+    :param filter_size_mask: the size of the Gaussian filter the pyramid is built with
+    :param backend: CONVOLVE or POLYPHASE, the way levels are reduced
+    :param cache: a PyramidCache to look the pyramid up in and add it to, None to always build it
+    :return: the pyramid
+    """
+    mask = mask.astype(float_dtype(im))
+    if mask.ndim < im.ndim:
+        # a single channel mask, which broadcasts over the channels of the images
+        mask = mask[..., np.newaxis]
+    return build_gaussian_pyramid(mask, max_levels, filter_size_mask, backend, cache)[0]
+
+def pyramid_blending(im1, im2, mask, max_levels, filter_size_im, filter_size_mask,
+                     backend=POLYPHASE, cache=None, workers=None, mask_pyr=None):
+    """
+    performs pyramid blending on two images. All channels (and all images of a batch) are blended
+    at once, with a single pyramid of the mask. With workers, the pyramids of the two images and
+    of the mask are built concurrently and the levels are blended concurrently, on a pool of
+    threads (scipy and numpy release the GIL while filtering and computing on whole levels)
+    :param im1: the first input image, of shape (H, W) or (H, W, C), or a batch of images of shape
+    (N, H, W, C)
+    :param im2: the second input image, of the same shape
     :param mask: a boolean (i.e. dtype == np.bool) mask containing True and False representing
-    which parts of im1 and im2 should appear in the resulting im_blend.
+    which parts of im1 and im2 should appear in the resulting im_blend. Of shape (H, W), shared by
+    all channels and images, or (N, H, W) for a mask per image of a batch
     :param max_levels: the max_levels parameter you should use when generating the Gaussian and
     Laplacian pyramids
     :param filter_size_im: the size of the Gaussian filter (an odd scalar that represents a
@@ -178,25 +640,43 @@ def pyramid_blending(im1, im2, mask, max_levels, filter_size_im, filter_size_mas
     :param filter_size_mask: the size of the Gaussian filter(an odd scalar that represents a
     squared filter) which defining the filter used in the construction of the Gaussian pyramid of
     mask.
+    :param backend: CONVOLVE or POLYPHASE, the way pyramid levels are reduced and expanded
+    :param cache: a PyramidCache to look the pyramids of the images and the mask up in, None to
+    always build them
+    :param workers: the number of threads to build the pyramids and blend the levels with, None
+    to do it all in the calling thread
+    :param mask_pyr: the mask's pyramid, as built by build_mask_pyramid, so a mask shared by many
+    blends (e.g. by all the frames of a video) is only reduced once. Built from mask if None
     :return: the blended image
     """
-    lap1, filter_vec = build_laplacian_pyramid(im1, max_levels, filter_size_im)
-    lap2 = build_laplacian_pyramid(im2, max_levels, filter_size_im)[0]
-    mask_gauss = build_gaussian_pyramid(mask.astype(np.double), max_levels, filter_size_mask)[0]
-    out_pyr = []
-    for i in range(len(lap1)):
-        out_i = (mask_gauss[i] * lap1[i]) + ((1 - mask_gauss[i]) * lap2[i])
-        out_pyr.append(out_i)
+    if workers is None:
+        lap1, filter_vec = build_laplacian_pyramid(im1, max_levels, filter_size_im, backend, cache)
+        lap2 = build_laplacian_pyramid(im2, max_levels, filter_size_im, backend, cache)[0]
+        if mask_pyr is None:
+            mask_pyr = build_mask_pyramid(mask, im1, max_levels, filter_size_mask, backend, cache)
+        out_pyr = list(map(blend_level, lap1, lap2, mask_pyr))
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            lap1 = executor.submit(build_laplacian_pyramid, im1, max_levels, filter_size_im,
+                                   backend, cache)
+            lap2 = executor.submit(build_laplacian_pyramid, im2, max_levels, filter_size_im,
+                                   backend, cache)
+            if mask_pyr is None:
+                mask_pyr = executor.submit(build_mask_pyramid, mask, im1, max_levels,
+                                           filter_size_mask, backend, cache).result()
+            lap1, filter_vec = lap1.result()
+            out_pyr = list(executor.map(blend_level, lap1, lap2.result()[0], mask_pyr))
     coeff = [1 for _ in lap1]
-    res = laplacian_to_image(out_pyr, filter_vec, coeff)
+    res = laplacian_to_image(out_pyr, filter_vec, coeff, backend)
     res = np.clip(res, 0, 1)
     return res
 
-def rgb_blend(im1, im2, mask, max_levels, filter_size_im, filter_size_mask):
+def rgb_blend(im1, im2, mask, max_levels, filter_size_im, filter_size_mask, backend=POLYPHASE,
+              cache=None, workers=None):
     """
     performs image blending of two rgb images
-    :param im1: first input image
-    :param im2: second input image
+    :param im1: first input image, of shape (H, W, 3), or a batch of images of shape (N, H, W, 3)
+    :param im2: second input image, of the same shape
     :param mask: a boolean (i.e. dtype == np.bool) mask containing True and False representing
     which parts of im1 and im2 should appear in the resulting im_blend.
     :param max_levels: the max_levels parameter you should use when generating the Gaussian and
@@ -207,15 +687,204 @@ def rgb_blend(im1, im2, mask, max_levels, filter_size_im, filter_size_mask):
     :param filter_size_mask: the size of the Gaussian filter(an odd scalar that represents a
     squared filter) which defining the filter used in the construction of the Gaussian pyramid of
     mask.
+    :param backend: CONVOLVE or POLYPHASE, the way pyramid levels are reduced and expanded
+    :param cache: a PyramidCache to look the pyramids of the images and the mask up in, None to
+    always build them
+    :param workers: the number of threads to build the pyramids and blend the levels with, None
+    to do it all in the calling thread
     :return: the blended image
     """
-    r1, g1, b1 = (im1[:, :, 0], im1[:, :, 1], im1[:, :, 2])
-    r2, g2, b2 = (im2[:, :, 0], im2[:, :, 1], im2[:, :, 2])
-    new_r = pyramid_blending(r1, r2, mask, max_levels, filter_size_im, filter_size_mask)
-    new_g = pyramid_blending(g1, g2, mask, max_levels, filter_size_im, filter_size_mask)
-    new_b = pyramid_blending(b1, b2, mask, max_levels, filter_size_im, filter_size_mask)
-    res = np.dstack((new_r, new_g, new_b))
-    return res
+    return pyramid_blending(im1, im2, mask, max_levels, filter_size_im, filter_size_mask, backend,
+                            cache, workers)
+
+def count_levels(rows, cols, max_levels):
+    """
+    counts the levels of the pyramids of an image, as built by build_gaussian_pyramid
+    :param rows: the number of rows of the image
+    :param cols: the number of columns of the image
+    :param max_levels: the maximal number of levels in the pyramids
+    :return: the number of levels
+    """
+    levels = 1
+    while levels < max_levels:
+        rows, cols = (rows + 1) // 2, (cols + 1) // 2
+        if rows < MIN_LEVEL_SIZE or cols < MIN_LEVEL_SIZE:
+            break
+        levels += 1
+    return levels
+
+def blending_halo(levels, radius_im, radius_mask):
+    """
+    finds how far from the edge of a window pyramid blending first gives a pixel that differs
+    from blending the whole image. Each reduce and each expand spreads the effect of the edge
+    inwards by the radius of its filter at its level's scale, so the spread is followed down the
+    Gaussian pyramids, into the blended Laplacian pyramid and back up through its reconstruction
+    :param levels: the number of levels of the pyramids
+    :param radius_im: the radius of the Gaussian filter of the images' pyramids
+    :param radius_mask: the radius of the Gaussian filter of the mask's pyramid
+    :return: the number of pixels next to a window's edge that aren't blended exactly
+    """
+    # the spread into each level of the Gaussian pyramids of the images and of the mask
+    gaussian_im = [radius_im * (2 ** level - 1) for level in range(levels)]
+    gaussian_mask = [radius_mask * (2 ** level - 1) for level in range(levels)]
+    # the top level of a Laplacian pyramid is a Gaussian level, and any other level takes the
+    # expanded level above it too
+    halo = max(gaussian_im[-1], gaussian_mask[-1])
+    for level in range(levels - 2, -1, -1):
+        expand = radius_im * 2 ** level
+        laplacian = max(gaussian_im[level + 1] + expand, gaussian_mask[level])
+        halo = max(laplacian, halo + expand)
+    return halo
+
+def tile_windows(length, tile_size, halo, min_window, unit):
+    """
+    splits an axis of an image into tiles, and finds the window around each tile that is blended
+    to find it
+    :param length: the length of the axis
+    :param tile_size: the length of a tile, a multiple of unit
+    :param halo: the length added to a tile on each side, a multiple of unit
+    :param min_window: the minimal length of a window
+    :param unit: the length windows are aligned to
+    :return: a list of (start, end, window start, window end) tuples
+    """
+    windows = []
+    for start in range(0, length, tile_size):
+        end = min(start + tile_size, length)
+        low, high = max(start - halo, 0), min(end + halo, length)
+        if high - low < min_window:
+            high = min(low + min_window, length)
+            low = max(high - min_window, 0)
+            low -= low % unit
+        windows.append((start, end, low, high))
+    return windows
+
+def tiled_pyramid_blending(im1, im2, mask, out, max_levels, filter_size_im, filter_size_mask,
+                           tile_size=DEFAULT_TILE_SIZE, backend=POLYPHASE, workers=None):
+    """
+    performs pyramid blending on two images one tile at a time, so only a few tiles are held in
+    memory at once. The images may be numpy.memmap arrays of files too large to load, and the
+    result is written to an array which may be a numpy.memmap too (e.g. as opened by
+    numpy.lib.format.open_memmap in 'w+' mode). Every tile is blended together with a halo around
+    it which is wide enough for the filters of all levels to never reach past it, and tiles are
+    aligned to the coarsest level's samples, so the result is the same as pyramid_blending's.
+    The halo grows with the coarsest level's sample spacing times the filters' radii, e.g. 448
+    pixels for 7 levels, an image filter of size 3 and a mask filter of size 13, and every tile
+    blends a window of its size plus two halos. Tiles are therefore at least MIN_TILE_HALOS halos
+    long, which keeps the pixels blended to at most 4 times those of the image
+    :param im1: the first input image, of shape (H, W) or (H, W, C), or a batch of images of shape
+    (N, H, W, C)
+    :param im2: the second input image, of the same shape
+    :param mask: a boolean mask, of shape (H, W) or (N, H, W), as taken by pyramid_blending
+    :param out: an array of the images' shape to write the blended image to
+    :param max_levels: the max_levels parameter you should use when generating the Gaussian and
+    Laplacian pyramids
+    :param filter_size_im: the size of the Gaussian filter used in the construction of the
+    Laplacian pyramids of im1 and im2
+    :param filter_size_mask: the size of the Gaussian filter used in the construction of the
+    Gaussian pyramid of mask
+    :param tile_size: the length of the side of a tile, rounded up to MIN_TILE_HALOS halos and to a
+    multiple of the coarsest level's sample spacing
+    :param backend: CONVOLVE or POLYPHASE, the way pyramid levels are reduced and expanded
+    :param workers: the number of threads each tile is blended with, None to blend tiles in the
+    calling thread
+    :return: out
+    """
+    rows, cols = spatial_axes(im1)
+    mask_rows = rows if mask.ndim > 2 else 0
+    levels = count_levels(im1.shape[rows], im1.shape[cols], max_levels)
+    # a sample of the coarsest level stands for unit pixels of the image
+    unit = 2 ** (levels - 1)
+    halo = blending_halo(levels, (filter_size_im - 1) // 2, (filter_size_mask - 1) // 2)
+    halo = -(-halo // unit) * unit
+    tile_size = -(-max(tile_size, MIN_TILE_HALOS * halo) // unit) * unit
+    # smaller windows would have fewer levels than the whole image
+    min_window = MIN_LEVEL_SIZE * unit
+    for row_start, row_end, row_low, row_high in tile_windows(im1.shape[rows], tile_size, halo,
+                                                              min_window, unit):
+        for col_start, col_end, col_low, col_high in tile_windows(im1.shape[cols], tile_size,
+                                                                  halo, min_window, unit):
+            window = [np.asarray(im[axis_slice(im.ndim, axis, slice(row_low, row_high))][
+                axis_slice(im.ndim, axis + 1, slice(col_low, col_high))])
+                      for im, axis in ((im1, rows), (im2, rows), (mask, mask_rows))]
+            res = pyramid_blending(*window, levels, filter_size_im, filter_size_mask, backend,
+                                   workers=workers)
+            res = res[axis_slice(res.ndim, rows, slice(row_start - row_low, row_end - row_low))][
+                axis_slice(res.ndim, cols, slice(col_start - col_low, col_end - col_low))]
+            out[axis_slice(out.ndim, rows, slice(row_start, row_end))][
+                axis_slice(out.ndim, cols, slice(col_start, col_end))] = res
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+def blend_frames(frames1, frames2, mask, max_levels, filter_size_im, filter_size_mask,
+                 backend=POLYPHASE, workers=None):
+    """
+    performs pyramid blending on two sequences of frames, one pair of frames at a time, so frames
+    may be streamed from videos of any length. A single mask is reduced once, for the first pair,
+    and its pyramid is reused for all the others
+    :param frames1: an iterable of the frames of the first video
+    :param frames2: an iterable of the frames of the second video, of the same shape. Blending
+    stops at the end of the shorter video
+    :param mask: a boolean mask as taken by pyramid_blending, shared by all frames, or an iterable
+    of a mask per frame
+    :param max_levels: the max_levels parameter you should use when generating the Gaussian and
+    Laplacian pyramids
+    :param filter_size_im: the size of the Gaussian filter used in the construction of the
+    Laplacian pyramids of the frames
+    :param filter_size_mask: the size of the Gaussian filter used in the construction of the
+    Gaussian pyramid of the mask
+    :param backend: CONVOLVE or POLYPHASE, the way pyramid levels are reduced and expanded
+    :param workers: the number of threads each pair of frames is blended with, None to blend in
+    the calling thread
+    :return: a generator of the blended frames
+    """
+    if isinstance(mask, np.ndarray):
+        mask_pyr = None
+        for im1, im2 in zip(frames1, frames2):
+            if mask_pyr is None:
+                mask_pyr = build_mask_pyramid(mask, im1, max_levels, filter_size_mask, backend)
+            yield pyramid_blending(im1, im2, mask, max_levels, filter_size_im, filter_size_mask,
+                                   backend, workers=workers, mask_pyr=mask_pyr)
+    else:
+        for im1, im2, frame_mask in zip(frames1, frames2, mask):
+            yield pyramid_blending(im1, im2, frame_mask, max_levels, filter_size_im,
+                                   filter_size_mask, backend, workers=workers)
+
+def blend_video(filename1, filename2, mask, out_filename, max_levels, filter_size_im,
+                filter_size_mask, representation=RGB, dtype=np.float64, fps=None,
+                backend=POLYPHASE, workers=None):
+    """
+    performs pyramid blending on two videos, streaming their frames from disk and writing every
+    blended frame as soon as it is blended, so memory use doesn't depend on the videos' length
+    :param filename1: the filename of the first video
+    :param filename2: the filename of the second video, whose frames are of the same size
+    :param mask: a boolean mask shared by all frames, the filename of a video of a mask per frame
+    (whose pixels are True where they are at least half bright), or an iterable of a mask per frame
+    :param out_filename: the filename of the blended video to write
+    :param max_levels: the max_levels parameter you should use when generating the Gaussian and
+    Laplacian pyramids
+    :param filter_size_im: the size of the Gaussian filter used in the construction of the
+    Laplacian pyramids of the frames
+    :param filter_size_mask: the size of the Gaussian filter used in the construction of the
+    Gaussian pyramid of the mask
+    :param representation: representation code, either 1 or 2 defining whether the videos are
+    blended in grayscale (1) or in RGB (2)
+    :param dtype: the floating point type the frames are blended in
+    :param fps: the number of frames per second of the blended video, that of the first video if
+    None
+    :param backend: CONVOLVE or POLYPHASE, the way pyramid levels are reduced and expanded
+    :param workers: the number of threads each pair of frames is blended with, None to blend in
+    the calling thread
+    :return: the number of frames written
+    """
+    if isinstance(mask, str):
+        mask = (frame >= 0.5 for frame in read_frames(mask, GRAYSCALE, dtype))
+    if fps is None:
+        fps = read_fps(filename1)
+    frames = blend_frames(read_frames(filename1, representation, dtype),
+                          read_frames(filename2, representation, dtype), mask, max_levels,
+                          filter_size_im, filter_size_mask, backend, workers)
+    return write_frames(out_filename, frames, fps)
 
 def example_display(im_tuple):
     """
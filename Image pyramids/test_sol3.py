@@ -0,0 +1,100 @@
+import tracemalloc
+import unittest
+import numpy as np
+import sol3
+
+
+class TestTiledPyramidBlending(unittest.TestCase):
+    """
+    Tests that blending images one tile at a time gives the same result as blending them whole
+    """
+
+    MAX_LEVELS = 4
+    FILTER_SIZE_IM = 3
+    FILTER_SIZE_MASK = 5
+    # the coarsest level's sample spacing is 8, so 100 splits the images into unaligned tiles
+    TILE_SIZES = (48, 100, 128)
+    SHAPE = (200, 264)
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.im1 = rng.random(TestTiledPyramidBlending.SHAPE + (3,))
+        self.im2 = rng.random(TestTiledPyramidBlending.SHAPE + (3,))
+        self.mask = rng.random(TestTiledPyramidBlending.SHAPE) > 0.5
+
+    def assert_tiled_blending(self, backend):
+        whole = sol3.pyramid_blending(self.im1, self.im2, self.mask,
+                                      TestTiledPyramidBlending.MAX_LEVELS,
+                                      TestTiledPyramidBlending.FILTER_SIZE_IM,
+                                      TestTiledPyramidBlending.FILTER_SIZE_MASK, backend)
+        for tile_size in TestTiledPyramidBlending.TILE_SIZES:
+            with self.subTest(tile_size=tile_size):
+                tiled = sol3.tiled_pyramid_blending(self.im1, self.im2, self.mask,
+                                                    np.empty_like(self.im1),
+                                                    TestTiledPyramidBlending.MAX_LEVELS,
+                                                    TestTiledPyramidBlending.FILTER_SIZE_IM,
+                                                    TestTiledPyramidBlending.FILTER_SIZE_MASK,
+                                                    tile_size, backend)
+                np.testing.assert_array_equal(tiled, whole)
+
+    def test_polyphase(self):
+        self.assert_tiled_blending(sol3.POLYPHASE)
+
+    def test_convolve(self):
+        self.assert_tiled_blending(sol3.CONVOLVE)
+
+    def test_halo(self):
+        # blending a window misses only the pixels within the halo of its edges
+        levels, radius_im, radius_mask = 3, 2, 4
+        halo = sol3.blending_halo(levels, radius_im, radius_mask)
+        whole = sol3.pyramid_blending(self.im1, self.im2, self.mask, levels, 2 * radius_im + 1,
+                                      2 * radius_mask + 1)
+        window = (slice(64, 192), slice(64, 192))
+        blended = sol3.pyramid_blending(self.im1[window], self.im2[window], self.mask[window],
+                                        levels, 2 * radius_im + 1, 2 * radius_mask + 1)
+        inner = slice(halo, -halo)
+        np.testing.assert_array_equal(blended[inner, inner], whole[window][inner, inner])
+
+
+class TestLaplacianToImage(unittest.TestCase):
+    """
+    Tests reconstructing images from laplacian pyramids into reused buffers
+    """
+
+    MAX_LEVELS = 5
+    FILTER_SIZE = 5
+    SHAPE = (1024, 1024, 3)
+    # numpy's iteration buffers are the only arrays allocated, whatever the size of the image
+    MAX_PEAK_FRACTION = 0.05
+
+    def assert_bounded_peak(self, backend, coeff):
+        im = np.random.default_rng(0).random(TestLaplacianToImage.SHAPE)
+        lpyr, filter_vec = sol3.build_laplacian_pyramid(im, TestLaplacianToImage.MAX_LEVELS,
+                                                        TestLaplacianToImage.FILTER_SIZE, backend)
+        coeff = [coeff] * len(lpyr)
+        expected = sol3.laplacian_to_image(lpyr, filter_vec, coeff, backend)
+        buffers = sol3.allocate_buffers(lpyr, filter_vec, backend)
+        tracemalloc.start()
+        try:
+            res = sol3.laplacian_to_image(lpyr, filter_vec, coeff, backend, buffers)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        np.testing.assert_array_equal(res, expected)
+        self.assertLess(peak, im.nbytes * TestLaplacianToImage.MAX_PEAK_FRACTION)
+
+    def test_polyphase(self):
+        self.assert_bounded_peak(sol3.POLYPHASE, 1)
+
+    def test_polyphase_coeff(self):
+        self.assert_bounded_peak(sol3.POLYPHASE, 0.5)
+
+    def test_convolve(self):
+        self.assert_bounded_peak(sol3.CONVOLVE, 1)
+
+    def test_convolve_coeff(self):
+        self.assert_bounded_peak(sol3.CONVOLVE, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()